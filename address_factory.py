@@ -9,6 +9,15 @@ class AddressFactory(object):
 
     def parse_address(self, address_text):
         address_components = self.parser.parse_and_validate_address(address_text)
+        return self.address_from_components(address_components)
+
+    def parse_addresses(self, address_texts, batch_parser):
+        return [
+            self.address_from_components(c)
+            for c in batch_parser.parse(address_texts)
+        ]
+
+    def address_from_components(self, address_components):
         if type(address_components) is rep.AddressParseFailed:
             return self.create_address(
                 address_components.components,
@@ -4,67 +4,112 @@ import requests
 import subprocess
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_categorical_dtype
 
 import json
+from itertools import islice
+from urllib.parse import unquote_plus
 
+from real_estate.http_session import PooledSession
+from real_estate.ordered_map import OrderedMap
+from real_estate.geocode_cache import GeocodeCache
+from real_estate.retry_policy import RetryPolicy
 
-def expontial_backoff(url, current_delay, max_delay, err_str=None):
-    while True:
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            if current_delay > max_delay:
-                print('Max retry delay exceeded. Printing error comment:')
-                if err_str is not None:
-                    print(err_str)
-                raise e
-            time.sleep(current_delay)
-            current_delay *= 2
-        else:
-            return response
+
+def expontial_backoff(url, current_delay, max_delay, err_str=None,
+                      session=None):
+    if session is None:
+        session = PooledSession.shared()
+    return RetryPolicy.from_backoff(current_delay, max_delay).get(
+        session, url, err_str)
 
 
 class SimpleSubprocess(object):
+    """
+    A server run as a subprocess. start and stop poll `ping_url`, at
+    exponentially increasing intervals, until the server is up or down, or
+    until the start up or shut down timeout passes. A server that is
+    already running is reused, and left running by stop.
+    """
+
+    PING_TIMEOUT = 1
+    FIRST_POLL_INTERVAL = 0.05
+    MAX_POLL_INTERVAL = 2
+
     def __init__(self):
         pass
 
     def start(self):
+        self.proc = None
+        if self.ping():
+            return
+
         self.proc = subprocess.Popen(
             self.start_command,
             stdin=subprocess.DEVNULL,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
-        time.sleep(self.start_up_time)
+        is_up = self.poll_until(
+            lambda: self.ping() or self.proc.poll() is not None,
+            self.start_up_timeout
+        )
+        if not is_up or not self.ping():
+            self.stop()
+            raise RuntimeError(
+                '%s did not start within %is.'
+                % (self.ping_url, self.start_up_timeout)
+            )
 
     def stop(self):
+        if self.proc is None:
+            return
+
         self.proc.terminate()
-        time.sleep(self.shut_down_time)
+        is_down = self.poll_until(
+            lambda: self.proc.poll() is not None and not self.ping(),
+            self.shut_down_timeout
+        )
+        if not is_down:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc = None
+
+    def poll_until(self, condition, timeout):
+        deadline = time.monotonic() + timeout
+        interval = self.FIRST_POLL_INTERVAL
+        while not condition():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.MAX_POLL_INTERVAL)
+        return True
 
     def ping(self):
         try:
-            requests.get(self.ping_url)
+            response = requests.get(self.ping_url, timeout=self.PING_TIMEOUT)
         except requests.exceptions.RequestException as e:
             return False
         else:
-            return True
+            # Elasticsearch answers 503 until the index is available.
+            return response.status_code < 500
 
 
 class ElasticsearchServer(SimpleSubprocess):
     def __init__(self):
         self.start_command = 'elasticsearch'
         self.ping_url = 'http://localhost:9200/addresses'
-        self.start_up_time = 30
-        self.shut_down_time = 10
+        self.start_up_timeout = 120
+        self.shut_down_timeout = 30
 
 
 class StreetscopeServer(SimpleSubprocess):
     def __init__(self, app_location):
         self.start_command = ('python3', app_location)
         self.ping_url = 'http://localhost:5000/about'
-        self.start_up_time = 3
-        self.shut_down_time = 1
+        self.start_up_timeout = 30
+        self.shut_down_timeout = 10
 
 
 class Geocoder(object):
@@ -83,12 +128,52 @@ class StreetscopeGeocoder(Geocoder):
     ]
     RE_SPACE = re.compile(r'\s+')
 
-    def __init__(self, verbose, streetscope_location):
+    GEOCODE_URL = 'http://localhost:5000/geocode?query='
+    MSEARCH_URL = 'http://localhost:9200/addresses/_msearch'
+    SEARCH_SIZE = 10
+    MAX_IN_FLIGHT = 8
+    # A bulk search can take a long time, so by default there's no timeout.
+    TIMEOUT = None
+
+    def __init__(self, verbose, streetscope_location, session=None,
+                 cache=None, max_in_flight=MAX_IN_FLIGHT,
+                 geocode_url=GEOCODE_URL,
+                 bulk_size=None, msearch_url=MSEARCH_URL):
         super().__init__(verbose)
         self.elasticsearch_server = ElasticsearchServer()
         self.streetscope_server = StreetscopeServer(streetscope_location)
         self.servers_running = False
 
+        if session is None:
+            session = PooledSession(
+                PooledSession.POOL_CONNECTIONS, PooledSession.POOL_MAXSIZE,
+                self.TIMEOUT
+            )
+        self.session = session
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.geocode_url = geocode_url
+        self.bulk_size = bulk_size
+        self.msearch_url = msearch_url
+
+    def from_settings(settings, verbose):
+        cache = None
+        if settings.geocode_cache_file is not None:
+            cache = GeocodeCache(settings.geocode_cache_file)
+        max_in_flight = settings.geocoder_max_in_flight
+        if max_in_flight is None:
+            max_in_flight = StreetscopeGeocoder.MAX_IN_FLIGHT
+        return StreetscopeGeocoder(
+            verbose, settings.streetscope_location,
+            session=PooledSession(
+                settings.http_pool_connections, settings.http_pool_maxsize,
+                settings.geocoder_timeout
+            ),
+            cache=cache,
+            max_in_flight=max_in_flight,
+            bulk_size=settings.geocoder_bulk_size
+        )
+
     def start_servers(self):
         if self.verbose:
             print('Starting the elasticsearch server.')
@@ -116,60 +201,176 @@ class StreetscopeGeocoder(Geocoder):
     def geocode_addresses(self, data):
         if not self.servers_running:
             raise RuntimeError('Geocoding servers have not been started.')
-        self.start_time = time.time()
-        self.data_len = len(data)
 
         data = self.clean_strings(data)
         column_names = ['latitude', 'longitude', 'geocoding_is_valid']
 
+        keys = [
+            GeocodeCache.key(a)
+            for a in data[self.INDICIES].itertuples(index=False)
+        ]
+        coords = self.geocode_unique_addresses(data[self.INDICIES], keys)
         coords = pd.DataFrame(
             columns=column_names,
-            data=list(data[self.INDICIES].apply(
-                self.geocode, raw=True, axis=1
-            ).values),
+            data=[coords[key] for key in keys],
             index=data.index
         )
 
         for a in column_names:
             data[a] = coords[a]
+
+        if self.verbose:
+            self.session.report()
+            if self.cache is not None:
+                self.cache.report()
         return data
 
+    def geocode_unique_addresses(self, addresses, keys):
+        """
+        Geocode each distinct address once, skipping those in the cache.
+        Returns a dict of coordinates by key.
+        """
+        is_first = ~pd.Series(keys).duplicated().values
+        unique_keys = [key for key, first in zip(keys, is_first) if first]
+        if self.cache is None:
+            coords = {}
+        else:
+            coords = self.cache.lookup_many(unique_keys)
+
+        is_missing = [key not in coords for key in unique_keys]
+        missing_keys = [
+            key for key, missing in zip(unique_keys, is_missing) if missing]
+        rows = addresses.loc[is_first].loc[
+            np.array(is_missing, dtype=bool)].reset_index(drop=True)
+
+        self.start_time = time.time()
+        self.data_len = len(rows)
+        geocoded = self.geocode_rows(rows)
+
+        if self.cache is not None:
+            self.cache.update_many(zip(missing_keys, geocoded))
+        coords.update(zip(missing_keys, geocoded))
+        return coords
+
+    QUOTES_REGEX = re.compile(r'"|\'|\*|%22|\^')
     def clean_strings(self, data):
         for a in ['house', 'house_number', 'road', 'suburb']:
-            data[a] = data[a].map(self.clean_string)
+            if is_categorical_dtype(data[a]):
+                # Only the categories are cleaned, and those that become
+                # equal are merged.
+                categories = data[a].cat.categories
+                cleaned = self.clean_series(
+                    pd.Series(categories, dtype=object))
+                data[a] = data[a].map(
+                    dict(zip(categories, cleaned))).astype('category')
+            elif data[a].dtype == object:
+                data[a] = self.clean_series(data[a])
         return data
 
-    QUOTES_REGEX = re.compile(r'"|\'|\*|%22|\^')
-    def clean_string(self, x):
-        if isinstance(x, str):
-            x = self.QUOTES_REGEX.sub('', x)
-            return x.strip()
+    def clean_series(self, series):
+        cleaned = series.str.replace(
+            self.QUOTES_REGEX, '', regex=True).str.strip()
+        # Values that aren't strings are left as they are.
+        return cleaned.where(cleaned.notnull(), series)
+
+    def geocode_rows(self, rows):
+        """
+        Geocode each row of `rows`, with up to `max_in_flight` requests at
+        a time, returning coordinates in row order. Rows are sent in
+        batches of `bulk_size` if it is set.
+        """
+        items = zip(self.mk_urls(rows), (r for _, r in rows.iterrows()))
+        if self.bulk_size is None:
+            fn = lambda item: self.geocode(*item)
         else:
-            return x
-
-    def geocode(self, r):
-        if r.name % 1000 == 0:
-            self.progress_summary(self.start_time, r.name, self.data_len)
+            fn, items = self.geocode_batch, self.batches(items)
 
-        url = self.mk_url(r)
-        result = StreetscopeGeocoder.request(url, r)
+        if self.max_in_flight > 1:
+            results = OrderedMap.map(fn, items, self.max_in_flight)
+        else:
+            results = map(fn, items)
+        if self.bulk_size is not None:
+            results = (coords for batch in results for coords in batch)
+
+        geocoded = []
+        for i, coords in enumerate(results):
+            if i % 1000 == 0:
+                self.progress_summary(self.start_time, i, self.data_len)
+            geocoded.append(coords)
+        return geocoded
+
+    def batches(self, items):
+        while True:
+            batch = list(islice(items, self.bulk_size))
+            if len(batch) == 0:
+                return
+            yield batch
+
+    def geocode(self, url, r):
+        result = self.request(url, r)
         coords = self.process_result(result, r)
         return coords
 
-    def mk_url(self, r):
-        return (
-            'http://localhost:5000/geocode?query=' +
-            self.RE_SPACE.sub('+', '+'.join(filter(None.__ne__, map(
-                lambda x:
-                    None
-                    if (pd.isnull(x[0]) or len(x[0])==0)
-                    else str(x[0]) + x[1],
-                zip(r[:-1], ('/', '', ',', ',', ''))
-            )))) + '+%.0f' % r[-1]
+    URL_SUFFIXES = ('/', '', ',', ',', '')
+
+    def mk_urls(self, data):
+        """The geocode URL for each row of `data`."""
+        query = pd.Series('', index=data.index)
+        for a, suffix in zip(self.INDICIES[:-1], self.URL_SUFFIXES):
+            text = data[a].astype(str)
+            present = data[a].notnull() & (text.str.len() > 0)
+            query += (text + suffix + '+').where(present, '')
+        query = query.str[:-1].str.replace(self.RE_SPACE, '+', regex=True)
+
+        postcodes = np.char.mod(
+            '%.0f', data[self.INDICIES[-1]].values.astype(float))
+        return list(self.geocode_url + query + '+' + postcodes)
+
+    def request(self, url, r):
+        return expontial_backoff(url, 0.1, 5, str(r), self.session).json()
+
+    def geocode_batch(self, items):
+        """
+        Geocode (url, row) `items` with one Elasticsearch _msearch request,
+        sending each row the search that Streetscope would. Rows whose
+        search fails are geocoded through Streetscope instead.
+        """
+        body = ''.join(
+            '{}\n%s\n' % json.dumps(self.search_body(self.mk_query(url)))
+            for url, _ in items
+        )
+        response = RetryPolicy.from_backoff(0.1, 5).request(
+            self.session, 'POST', self.msearch_url, str(items[0][1]),
+            data=body, headers={'Content-Type': 'application/x-ndjson'}
         )
 
-    def request(url, r):
-        return expontial_backoff(url, 0.1, 5, str(r)).json()
+        coords = []
+        for (url, r), result in zip(items, response.json()['responses']):
+            if 'error' in result:
+                coords.append(self.geocode(url, r))
+            else:
+                coords.append(
+                    self.process_result(self.search_result(result), r))
+        return coords
+
+    def mk_query(self, url):
+        """The query string that Streetscope receives for a geocode URL."""
+        return unquote_plus(url[len(self.geocode_url):])
+
+    def search_body(self, query):
+        return {
+            'size': self.SEARCH_SIZE,
+            'query': {'match': {'ADDRESS': {
+                'query': query, 'operator': 'and'
+            }}}
+        }
+
+    def search_result(self, result):
+        """Reshape a search response like Streetscope's geocode response."""
+        total = result['hits']['total']
+        if isinstance(total, dict):
+            total = total['value']
+        return {'total': total, 'hits': result['hits']['hits']}
 
     NO_COORDS = [np.NaN, np.NaN, False]
     def process_result(self, result, row):
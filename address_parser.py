@@ -1,9 +1,12 @@
+import os
 import math
 import numpy as np
+import pandas as pd
 
 from postal import parser
 import re
 import real_estate.real_estate_property as rep
+from real_estate.json_load_and_dump import JSONLoadAndDump
 
 
 class RealEstateAddressParser(object):
@@ -16,108 +19,107 @@ class RealEstateAddressParser(object):
     pypostal: https://github.com/openvenues/pypostal
     """
 
-    PREPROCESSING_REGEX_SUBSTITUTIONS = [(re.compile(a), b) for a, b in [
-        (r'  ', r' '),
+    # Each substitution has a literal that any string it matches must
+    # contain, ignoring case, so that most substitutions can be skipped.
+    PREPROCESSING_REGEX_SUBSTITUTIONS = [
+        (r'  ', r' ', '  '),
 
         # libpostal doesn't like '&' between street names.
-        (r'([a-zA-Z]+)(?: \& )([a-zA-Z]+)', r'\1 and \2'),
+        (r'([a-zA-Z]+)(?: \& )([a-zA-Z]+)', r'\1 and \2', ' & '),
 
         # Ending with a partial postcode and '...'.
-        (r'(.*)(?:\d{2}\.{3})$', r'\1'),
+        (r'(.*)(?:\d{2}\.{3})$', r'\1', '...'),
 
         # Ending with '...'.
-        (r'(.*)(?:\.{3})$', r'\1'),
+        (r'(.*)(?:\.{3})$', r'\1', '...'),
 
         # Special case. Remove '. '.
-        (r'^(\. )', r''),
+        (r'^(\. )', r'', '. '),
 
         # Remove "'" and '/' from property names.
-        (r'\'([a-zA-Z ]+)\'/', r'\1 '),
-        (r'\'([a-zA-Z ]+)\'', r'\1'),
+        (r'\'([a-zA-Z ]+)\'/', r'\1 ', '\'/'),
+        (r'\'([a-zA-Z ]+)\'', r'\1', '\''),
 
         # Special case. Fix a typo
-        (r'^(\d+) (-\d+)', r'\1\2'),
+        (r'^(\d+) (-\d+)', r'\1\2', ' -'),
 
         # Special case. Fix typos
-        (r'([a-zA-Z ]+)/blocks ([0-9]+)- section ([0-9]+), (?i)',
-         r'\1 block __\2__ section __\3__, __no_street__ street, '),
+        (r'(?i)([a-zA-Z ]+)/blocks ([0-9]+)- section ([0-9]+), ',
+         r'\1 block __\2__ section __\3__, __no_street__ street, ',
+         '/blocks '),
 
         # Address doesn't have a street which confuses libpostal, so we
         # insert a fake street that will be removed after parsing.
-        (r'block ([a-zA-Z0-9]+) section ([a-zA-Z0-9]+)( [a-zA-Z]+)?, (?i)',
-         r'block __\1__ section __\2__\3, __no_street__ street, '),
+        (r'(?i)block ([a-zA-Z0-9]+) section ([a-zA-Z0-9]+)( [a-zA-Z]+)?, ',
+         r'block __\1__ section __\2__\3, __no_street__ street, ',
+         'block '),
 
         # Special case. Insert a fake street to help libpostal.
-        (r'^(?:\* |\*/\* )\(no street name\), (?i)',
-         r'__no_street__ street, '),
+        (r'(?i)^(?:\* |\*/\* )\(no street name\), ',
+         r'__no_street__ street, ', '(no street name), '),
 
         # Special case.
-        (r'^(.*), address available on request$(?i)',
-         r'__address_available_on_request__ street, \1'),
+        (r'(?i)^(.*), address available on request$',
+         r'__address_available_on_request__ street, \1',
+         ', address available on request'),
 
         # libpostal doesn't understand the 'unit' prefix.
-        (r'^units? (\d+), (?i)', r'\1/'),
+        (r'(?i)^units? (\d+), ', r'\1/', 'unit'),
 
         # Special case, Taggerty Steet without a street name.
-        (r'(\d+ taggerty), (ngunnawal)(?i)', r'\1 Street, \2'),
-        (r'(\d+ yerradhang), (ngunnawal)(?i)', r'\1 Street, \2'),
-        (r'(\d+ bunda), (city)(?i)', r'\1 Street, \2'),
-        (r'(\d+ chaseling), (phillip)(?i)', r'\1 Street, \2'),
-        (r'(\d+ constitution), (reid)(?i)', r'\1 Avenue, \2'),
+        (r'(?i)(\d+ taggerty), (ngunnawal)', r'\1 Street, \2',
+         'taggerty, ngunnawal'),
+        (r'(?i)(\d+ yerradhang), (ngunnawal)', r'\1 Street, \2',
+         'yerradhang, ngunnawal'),
+        (r'(?i)(\d+ bunda), (city)', r'\1 Street, \2', 'bunda, city'),
+        (r'(?i)(\d+ chaseling), (phillip)', r'\1 Street, \2',
+         'chaseling, phillip'),
+        (r'(?i)(\d+ constitution), (reid)', r'\1 Avenue, \2',
+         'constitution, reid'),
 
         # Special case, Totterdell is a loop and a street in Belconnen.
-        (r'(1-9 totterdell), (belconnen)(?i)', r'\1 Street, \2'),
+        (r'(?i)(1-9 totterdell), (belconnen)', r'\1 Street, \2',
+         '1-9 totterdell, belconnen'),
 
         # Special cases.
         (
-            r'^(\d+/\d+) manhattan on the park ([a-zA-Z]+)(?i)',
-            r'__manhattan_on_the_park__ \1 \2'
+            r'(?i)^(\d+/\d+) manhattan on the park ([a-zA-Z]+)',
+            r'__manhattan_on_the_park__ \1 \2',
+            ' manhattan on the park '
         ),
-        (r'^(nibu) - (\d+)(?i)', r'__\1__ \2'),
-        (r'^(\d+ [a-zA-Z ]+) (form), (?i)', r'__\2__ \1, '),
-        (r'^(\d+ [a-zA-Z ]+) (hudson) (square), (?i)', r'__\2_\3__ \1, '),
-        (r'^(\d+) (mosaic),(\d+)(?i)', r'__\2__ \1/\3'),
+        (r'(?i)^(nibu) - (\d+)', r'__\1__ \2', 'nibu - '),
+        (r'(?i)^(\d+ [a-zA-Z ]+) (form), ', r'__\2__ \1, ', ' form, '),
+        (r'(?i)^(\d+ [a-zA-Z ]+) (hudson) (square), ', r'__\2_\3__ \1, ',
+         ' hudson square, '),
+        (r'(?i)^(\d+) (mosaic),(\d+)', r'__\2__ \1/\3', ' mosaic,'),
 
         # Special 'Malmo' case.
-        (r'^(malmo) (\d+)(?i)', r'__\1__, \2'),
-    ]]
-
-    POSTPROCESSING_LAMBDAS = [
-        # Remove fake streets. Perserve order, remove all occurances (not a
-        # set operation).
-        (lambda x: [a for a in x if a != ('__no_street__ street', 'road')]),
-
-        (lambda x: [
-            (re.sub('__', '', a), b)
-            if re.match(
-                r'.*block __[a-z0-9]+__ section __[a-z0-9]+__', a
-            ) is not None
-            else (a, b)
-            for a, b in x
-        ])
+        (r'(?i)^(malmo) (\d+)', r'__\1__, \2', 'malmo '),
     ]
 
+    # Fake streets to remove. Perserve order, remove all occurances (not a
+    # set operation).
+    POSTPROCESSING_REMOVALS = [('__no_street__ street', 'road')]
+
+    BLOCK_AND_SECTION_REGEX = re.compile(
+        r'.*block __[a-z0-9]+__ section __[a-z0-9]+__')
+
     POSTPROCESSING_SUBSTITUTIONS = [
         # Turn ACT back into a state for certain special cases.
         (('__act__', 'road'), ('act', 'state')),
         (('__act__', 'city'), ('act', 'state')),
 
-        # Special cases.
-        (('__nibu__', 'house'), ('nibu', 'house')),
-        (('__form__', 'house'), ('form', 'house')),
-        (('__hudson_square__', 'house'), ('hudson square', 'house')),
-        (('__mosaic__', 'house'), ('mosaic', 'house')),
-        (('__malmo__', 'house'), ('malmo', 'house')),
-        (
-            ('__manhattan_on_the_park__', 'house'),
-            ('manhattan on the park', 'house')
-        ),
         (
             ('__address_available_on_request__ street', 'road'),
             ('address available on request', 'special')
         ),
     ]
 
+    # Further substitutions, mostly special cases, are listed in this file.
+    # They take precedence over POSTPROCESSING_SUBSTITUTIONS.
+    POSTPROCESSING_FILE = os.path.join(
+        os.path.dirname(__file__), 'address_postprocessing.json')
+
     STREET_NAMES_REQUIRING_FIXES = [
         # Certain road names confuse libpostal.
         # TODO Figure out how to make this general.
@@ -155,6 +157,37 @@ class RealEstateAddressParser(object):
         'elizabeth jolley crescent'
     ]
 
+    def __init__(self, postprocessing_file=POSTPROCESSING_FILE):
+        self.preprocessing_substitutions = [
+            (re.compile(pattern), replacement, literal.lower())
+            for pattern, replacement, literal
+            in self.PREPROCESSING_REGEX_SUBSTITUTIONS
+        ]
+
+        # One regex matches any of the street names, and the replacement
+        # is looked up by the lower case name.
+        self.street_fixes = dict(
+            (x.lower(), self.street_fix_format(x) + ', ')
+            for x in self.STREET_NAMES_REQUIRING_FIXES
+        )
+        self.street_fixes_regex = re.compile(
+            r'(?i)(%s), ' % '|'.join(
+                re.escape(x) for x in self.STREET_NAMES_REQUIRING_FIXES)
+        )
+
+        # (value, label) components mapped to their replacement, or to None
+        # if they should be removed.
+        self.postprocessing_substitutions = dict(
+            [(x, None) for x in self.POSTPROCESSING_REMOVALS] +
+            self.POSTPROCESSING_SUBSTITUTIONS +
+            RealEstateAddressParser.load_postprocessing_substitutions(
+                postprocessing_file) +
+            [
+                ((self.street_fix_format(x), 'road'), (x, 'road'))
+                for x in self.STREET_NAMES_REQUIRING_FIXES
+            ]
+        )
+
     def parse_and_validate_address(self, address_string):
         if isinstance(address_string, float) and math.isnan(address_string):
             return rep.AddressParseFailed(address_string, [])
@@ -169,6 +202,26 @@ class RealEstateAddressParser(object):
         else:
             return rep.AddressParseFailed(address_string, address_components)
 
+    def parse_and_validate_addresses(self, address_strings):
+        """
+        Like parse_and_validate_address for each string, but validates the
+        components of all the addresses together.
+        """
+        address_strings = list(address_strings)
+        is_nan = [
+            isinstance(s, float) and math.isnan(s) for s in address_strings
+        ]
+        components_list = [
+            [] if nan else self.parse_address(s)
+            for s, nan in zip(address_strings, is_nan)
+        ]
+        valid = AddressComponentValidator().validate_batch(components_list)
+        return [
+            c if v and not nan else rep.AddressParseFailed(s, c)
+            for s, c, v, nan
+            in zip(address_strings, components_list, valid, is_nan)
+        ]
+
     def parse_address(self, address_string):
         address_string = self.preprocess_string(address_string)
         address_components = parser.parse_address(
@@ -179,47 +232,45 @@ class RealEstateAddressParser(object):
         return address_components
 
     def preprocess_string(self, address_string):
-        for regex, replacement in self.PREPROCESSING_REGEX_SUBSTITUTIONS:
-            address_string = regex.sub(replacement, address_string)
+        lowered = address_string.lower()
+        for regex, replacement, literal in self.preprocessing_substitutions:
+            if literal in lowered:
+                address_string, n = regex.subn(replacement, address_string)
+                if n > 0:
+                    lowered = address_string.lower()
 
         address_string = self.apply_street_name_preprocessing_fixes(
             address_string)
         return address_string
 
     def apply_street_name_preprocessing_fixes(self, address_string):
-        regex_fixes = [
-            (r'%s, (?i)' % x, self.street_fix_format(x) + ', ')
-            for x in self.STREET_NAMES_REQUIRING_FIXES
-        ]
-        for regex, replacement in regex_fixes:
-            address_string = re.sub(regex, replacement, address_string)
-        return address_string
+        return self.street_fixes_regex.sub(
+            lambda m: self.street_fixes[m.group(1).lower()],
+            address_string
+        )
 
     def street_fix_format(self, string):
         return r'__%s__ street' % re.compile(' ').sub('_', string)
 
     def postprocess_components(self, address_components):
-        for fn in self.POSTPROCESSING_LAMBDAS:
-            address_components = fn(address_components)
-
-        for match, substitute in self.POSTPROCESSING_SUBSTITUTIONS:
-            address_components = [
-                substitute if a == match else a for a in address_components
-            ]
-        address_components = self.apply_street_name_postprocessing_fixes(
-            address_components)
-        return address_components
-
-    def apply_street_name_postprocessing_fixes(self, address_components):
-        substitutions = [
-            ((self.street_fix_format(x), 'road'), (x, 'road'))
-            for x in self.STREET_NAMES_REQUIRING_FIXES
+        postprocessed = []
+        for component in address_components:
+            if component in self.postprocessing_substitutions:
+                component = self.postprocessing_substitutions[component]
+                if component is None:
+                    continue
+            elif ('block __' in component[0] and
+                  self.BLOCK_AND_SECTION_REGEX.match(component[0]) is not None):
+                component = (component[0].replace('__', ''), component[1])
+            postprocessed.append(component)
+        return postprocessed
+
+    def load_postprocessing_substitutions(file_path):
+        substitutions = JSONLoadAndDump.load_from_file(file_path)
+        return [
+            (tuple(match), tuple(substitute))
+            for match, substitute in substitutions['substitutions']
         ]
-        for match, substitute in substitutions:
-            address_components = [
-                substitute if a == match else a for a in address_components
-            ]
-        return address_components
 
 
 class AddressComponentValidator():
@@ -242,6 +293,57 @@ class AddressComponentValidator():
         ]
         return all(checks)
 
+    def validate_batch(self, components_list):
+        """Return a boolean array, True for each valid list of components."""
+        table = AddressComponentValidator.components_table(components_list)
+        return self.validate_table(table, len(components_list))
+
+    def components_table(components_list):
+        """
+        Flatten the components of many addresses into one table, with
+        the index of each component's address.
+        """
+        lengths = [len(components) for components in components_list]
+        values = [v for components in components_list for v, _ in components]
+        labels = [l for components in components_list for _, l in components]
+        return pd.DataFrame({
+            'address': np.repeat(np.arange(len(lengths)), lengths),
+            'value': pd.Series(values, dtype=object),
+            'label': pd.Series(labels, dtype=object),
+        })
+
+    def validate_table(self, table, n):
+        address = table['address'].values
+        label_codes, labels = pd.factorize(table['label'])
+        label_code = dict((label, code) for code, label in enumerate(labels))
+        n_labels = max(len(labels), 1)
+
+        def count(mask):
+            return np.bincount(address[mask], minlength=n)
+
+        def has(label):
+            if label not in label_code:
+                return np.zeros(n, dtype=bool)
+            return count(label_codes == label_code[label]) > 0
+
+        # Sort the (address, label) keys so that duplicates are adjacent.
+        keys = np.sort(address * n_labels + label_codes)
+        duplicates = keys[1:][keys[1:] == keys[:-1]]
+        valid = np.bincount(duplicates // n_labels, minlength=n) == 0
+
+        valid &= ~(has('suburb') & has('city'))
+        for requires_one_of_these in self.REQUIRED_ADDRESS_COMPONENTS:
+            valid &= np.logical_or.reduce(
+                [has(label) for label in requires_one_of_these])
+
+        # Each distinct value is only matched once.
+        value_codes, values = pd.factorize(table['value'])
+        for regex in self.REJECTED_REGEX:
+            rejected = np.array(
+                [regex.match(v) is not None for v in values], dtype=bool)
+            valid &= count(rejected[value_codes]) == 0
+        return valid
+
     def component_names(self, components):
         return [x for _, x in components]
 
@@ -4,8 +4,8 @@ from real_estate.address_factory import AddressFactory
 
 
 class Parser():
-    def parse_address_strings(df):
-        addresses = Parser.parse_strings(df['address_text'])
+    def parse_address_strings(df, batch_parser=None):
+        addresses = Parser.parse_strings(df['address_text'], batch_parser)
         addresses_df = Parser.create_addresses_df(addresses)
 
         for name in addresses_df.columns.values:
@@ -20,7 +20,9 @@ class Parser():
         df = pd.DataFrame.from_records(data, columns=column_names)
         return df
 
-    def parse_strings(strings):
+    def parse_strings(strings, batch_parser=None):
         factory = AddressFactory()
+        if batch_parser is not None:
+            return factory.parse_addresses(strings, batch_parser)
         addresses = [factory.parse_address(s) for s in strings]
         return addresses
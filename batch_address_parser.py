@@ -0,0 +1,118 @@
+import os
+import hashlib
+import functools
+
+import real_estate.real_estate_property as rep
+from real_estate.key_value_store import SQLiteStore
+from real_estate.multiprocessing.processed_address_parser import (
+    ParserWorkerPool, import_parser)
+
+
+class BatchAddressParser(object):
+    """
+    Parse address strings in batches, memoising the results.
+
+    Input strings are deduplicated and looked up in a persistent memo of
+    string to components. Only unseen strings are parsed with libpostal,
+    in chunks across a ParserWorkerPool, and the results are mapped back to
+    the input order. The memo is keyed on a hash of the address parser
+    source and its postprocessing file, so changes to the parsing rules
+    start a new one.
+
+    libpostal is only imported in the worker processes.
+    """
+
+    CHUNK_SIZE = 500
+    PARSER_SOURCE = os.path.join(
+        os.path.dirname(__file__), 'address_parser.py')
+    POSTPROCESSING_FILE = os.path.join(
+        os.path.dirname(__file__), 'address_postprocessing.json')
+
+    def __init__(self, memo_file_path, processes=None, chunk_size=CHUNK_SIZE,
+                 worker_pool=None, postprocessing_file=POSTPROCESSING_FILE):
+        self.memo = SQLiteStore(
+            memo_file_path,
+            'components_%s' %
+            BatchAddressParser.parser_version(postprocessing_file)
+        )
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.postprocessing_file = postprocessing_file
+        self.worker_pool = worker_pool
+        self.owns_worker_pool = worker_pool is None
+        self.memo_hits = 0
+        self.parsed = 0
+
+    def from_settings(settings, memo_file_path):
+        return BatchAddressParser(
+            memo_file_path, processes=settings.address_parser_processes)
+
+    def parser_version(postprocessing_file=POSTPROCESSING_FILE):
+        sha1 = hashlib.sha1()
+        for file_path in [
+            BatchAddressParser.PARSER_SOURCE, postprocessing_file
+        ]:
+            with open(file_path, 'rb') as f:
+                sha1.update(f.read())
+        return sha1.hexdigest()[:12]
+
+    def parse(self, strings):
+        """Return components, or AddressParseFailed, for each string."""
+        strings = list(strings)
+        unique = BatchAddressParser.unique_strings(strings)
+        results = dict(
+            (s, BatchAddressParser.decode(s, value))
+            for s, value in self.memo.get_many(unique).items()
+        )
+        self.memo_hits += len(results)
+
+        unseen = [s for s in unique if s not in results]
+        if len(unseen) > 0:
+            parsed = self.parse_unseen(unseen)
+            self.memo.put_many(
+                (s, BatchAddressParser.encode(c)) for s, c in zip(unseen, parsed)
+            )
+            results.update(zip(unseen, parsed))
+            self.parsed += len(unseen)
+
+        return [
+            results[s] if isinstance(s, str) else rep.AddressParseFailed(s, [])
+            for s in strings
+        ]
+
+    def unique_strings(strings):
+        return list(dict.fromkeys(s for s in strings if isinstance(s, str)))
+
+    def parse_unseen(self, strings):
+        if self.worker_pool is None:
+            self.worker_pool = ParserWorkerPool(
+                self.processes, self.chunk_size,
+                functools.partial(import_parser, self.postprocessing_file)
+            )
+        return self.worker_pool.parse(strings)
+
+    def encode(components):
+        if type(components) is rep.AddressParseFailed:
+            return {'valid': False, 'components': components.components}
+        else:
+            return {'valid': True, 'components': components}
+
+    def decode(string, value):
+        components = [tuple(c) for c in value['components']]
+        if value['valid']:
+            return components
+        else:
+            return rep.AddressParseFailed(string, components)
+
+    def report(self):
+        total = self.memo_hits + self.parsed
+        print(
+            'Parsed %i unique address strings, %i (%.1f%%) from the memo.'
+            % (total, self.memo_hits,
+               100 * self.memo_hits / max(total, 1))
+        )
+
+    def close(self):
+        self.memo.close()
+        if self.owns_worker_pool and self.worker_pool is not None:
+            self.worker_pool.close()
@@ -3,11 +3,18 @@ import numpy as np
 from IPython.display import display, HTML
 
 from real_estate.data_processing.data_storer import DataStorer
+from real_estate.models.xy import XY
 
 
 class DataAnalysis():
+    BROKEN_SEQUENCE_COLUMNS = [
+        'state', 'suburb', 'postcode', 'road', 'house', 'house_number',
+        'property_type', 'bedrooms', 'bathrooms', 'garage_spaces',
+    ]
+
     def run(data_file_path, file_type, xy_class, outputs_dir):
-        data = DataStorer.read_ft(file_type, data_file_path)
+        data = DataStorer.read_ft(
+            file_type, data_file_path, DataAnalysis.data_columns(xy_class))
         xy = xy_class(
             data, xy_class.GENERIC_X_SPEC, exclude_suburb=False,
             filter_on_suburb_population=True
@@ -15,6 +22,12 @@ class DataAnalysis():
         DataAnalysis.data_summary(data, xy, outputs_dir)
         xy.report_on_data_qc(data, outputs_dir)
 
+    def data_columns(xy_class):
+        columns = XY.data_columns(xy_class, xy_class.GENERIC_X_SPEC)
+        columns += DataAnalysis.BROKEN_SEQUENCE_COLUMNS
+        columns.append('sequence_broken')
+        return list(dict.fromkeys(columns))
+
     def display_df_as_html(df):
         DataAnalysis.display_styler_as_html(df.style)
 
@@ -44,12 +57,7 @@ class DataAnalysis():
         )
 
     def analyse_broken_sequences(filtered_data, xy, output_file):
-        ordered_column_names_wo_price = [
-            'state', 'suburb', 'postcode', 'road', 'house', 'house_number',
-            'property_type', 'bedrooms', 'bathrooms', 'garage_spaces',
-            # 'price_min', 'price_max',
-            # 'sale_type', 'under_contract', 'under_application'
-        ]
+        ordered_column_names_wo_price = DataAnalysis.BROKEN_SEQUENCE_COLUMNS
         sorted_data = filtered_data.sort_values(
             ordered_column_names_wo_price, axis=0)
         duplicated = sorted_data.duplicated(
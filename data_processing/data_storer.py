@@ -2,16 +2,26 @@ import pandas as pd
 import numpy as np
 import os
 import datetime
+from pandas.api.types import is_categorical_dtype, is_numeric_dtype
 
 from real_estate.memory_usage import MU
+from real_estate.data_processing.partitioned_store import PartitionedStore
+from real_estate.models.unduplicator import Unduplicator
 
 
 class DataStorer():
     NEW_COLUMNS = ('address_text', 'state', 'postcode')
     THIRTY_OME_DAYS = datetime.timedelta(days=31)
 
+    CATEGORICAL_COLUMNS = (
+        'sale_type', 'under_application', 'property_type',
+        'house', 'road', 'suburb', 'state', 'postcode'
+    )
+    FLOAT32_COLUMNS = ('bedrooms', 'bathrooms', 'garage_spaces')
+    MIGRATE_CHECK_ROWS = 10000
+
     def create_new_unless_exists(df, file_type, file_path):
-        if os.path.isfile(file_path):
+        if DataStorer.ft_exists(file_type, file_path):
             pass
         else:
             print('Data file did not exist, creating it: %s' % file_path)
@@ -20,6 +30,10 @@ class DataStorer():
             DataStorer.to_ft(df, file_type, file_path)
 
     def update_data_store(new_data, file_type, file_path, scrape_time):
+        if file_type == 'partitioned_hdf':
+            return DataStorer.update_partitioned_data_store(
+                new_data, file_path, scrape_time)
+
         new_shape = new_data.shape
         MU.print_memory_usage('07.01')
         # new_data = new_data.copy()
@@ -40,6 +54,23 @@ class DataStorer():
             (str(new_shape), str(current_shape), str(updated_shape))
         )
 
+    def update_partitioned_data_store(new_data, dir_path, scrape_time):
+        def update_open_partitions(current_data):
+            if current_data.empty:
+                return DataStorer.reformat_dataframe(new_data.copy())
+            current_data = DataStorer.maybe_apply_data_fixes(current_data)
+            updated_data = DataStorer.update_data(
+                current_data, new_data, scrape_time)
+            return DataStorer.remove_categoricals(updated_data)
+
+        current_shape, updated_shape = PartitionedStore.update(
+            dir_path, update_open_partitions)
+        print(
+            'Data shape: new shape %s; open partitions shape %s; '
+            'updated partitions shape %s.' %
+            (str(new_data.shape), str(current_shape), str(updated_shape))
+        )
+
     def update_data(current_data, new_data, scrape_time):
         wip_data = DataStorer.update_unbroken_sequences(
             current_data, new_data, scrape_time
@@ -49,37 +80,13 @@ class DataStorer():
 
     def update_unbroken_sequences(current_data, new_data, scrape_time):
         updated_data = DataStorer.break_sequences(current_data, scrape_time)
-        unbrokens = DataStorer.merge_unbrokens(updated_data, new_data)
         updated_data = DataStorer.update_last_encountered(
-            updated_data, unbrokens)
+            updated_data, new_data)
         return updated_data
 
-    def merge_unbrokens(updated_data, new_data):
-        id_columns = DataStorer.get_id_columns(new_data)
-        unbrokens = updated_data[
-            DataStorer.sequence_unbroken_filter(updated_data)
-        ]
-        unbrokens = pd.merge(unbrokens, new_data, how='inner', on=id_columns)
-        # unbrokens = unbrokens[
-        #     unbrokens['date_scraped'] >= unbrokens['last_encounted']
-        # ]
-        return unbrokens
-
     def sequence_unbroken_filter(data):
         return data['sequence_broken'] == False
 
-    def eq_test(series, value):
-        if isinstance(value, datetime.datetime):
-            return series==value
-        if isinstance(value, str):
-            return series==value
-        elif value is None:
-            return series.isnull()
-        elif np.isnan(value):
-            return series.isnull()
-        else:
-            return series==value
-
     def break_sequences(current_data, scrape_time):
         unbrokens = current_data[
             DataStorer.sequence_unbroken_filter(current_data)
@@ -88,21 +95,10 @@ class DataStorer():
             DataStorer.sequence_unbroken_filter(current_data),
             'sequence_broken'
         ] = (
-            # DataStorer.zero_matches_filter(current_data, unbrokens) |
             DataStorer.too_old_filter(current_data, unbrokens, scrape_time)
         )
         return current_data
 
-    def zero_matches_filter(current_data, unbrokens):
-        return current_data.loc[
-            DataStorer.sequence_unbroken_filter(current_data),
-            :
-        ].apply(
-            DataStorer.zero_matches, axis=1, reduce=False, args=(
-                unbrokens, DataStorer.get_id_columns(current_data)
-            )
-        )
-
     def too_old_filter(current_data, unbrokens, scrape_time):
         return current_data.loc[
             DataStorer.sequence_unbroken_filter(current_data),
@@ -112,60 +108,87 @@ class DataStorer():
     def get_id_columns(df):
         return list(df.columns.difference(['date_scraped']).values)
 
-    def zero_matches(r, x, cols):
-        return not DataStorer.any_matches(r, x, cols)
-
-    def any_matches(r, x, cols):
-        return DataStorer.identicles_selection(r, x, cols).any()
+    def matching_rows(x, y, cols):
+        """
+        Return a DataFrame of the positions, 'x' and 'y', of each pair of
+        rows in `x` and `y` that are equal in `cols`, with nulls equal to
+        nulls. Rows are joined on a hash of the columns whose dtypes agree,
+        and every pair is then compared on all `cols` to rule out hash
+        collisions.
+        """
+        x = x[cols].reset_index(drop=True)
+        y = y[cols].reset_index(drop=True)
+        hash_cols = []
+        for col in cols:
+            if x[col].dtype == y[col].dtype:
+                pass
+            elif is_numeric_dtype(x[col]) and is_numeric_dtype(y[col]):
+                x[col] = x[col].astype(np.float64)
+                y[col] = y[col].astype(np.float64)
+            elif is_categorical_dtype(x[col]) or is_categorical_dtype(y[col]):
+                x[col] = x[col].astype(object)
+                y[col] = y[col].astype(object)
+            if x[col].dtype == y[col].dtype:
+                hash_cols.append(col)
+
+        pairs = pd.merge(
+            pd.DataFrame({
+                'x': np.arange(len(x)),
+                'hash': DataStorer.row_hashes(x, hash_cols),
+            }),
+            pd.DataFrame({
+                'y': np.arange(len(y)),
+                'hash': DataStorer.row_hashes(y, hash_cols),
+            }),
+            how='inner', on='hash'
+        )
 
-    def identicles_selection(r, x, cols):
-        return np.all(list(DataStorer.eq_test(x[i], r[i]) for i in cols), axis=0)
+        equal = np.ones(len(pairs), dtype=bool)
+        for col in cols:
+            a = x[col].values[pairs['x'].values]
+            b = y[col].values[pairs['y'].values]
+            equal &= (a == b) | (pd.isnull(a) & pd.isnull(b))
+        return pairs.loc[equal, ['x', 'y']]
+
+    def row_hashes(df, cols):
+        if len(cols) == 0:
+            return np.zeros(len(df), dtype=np.uint64)
+        return pd.util.hash_pandas_object(df[cols], index=False).values
+
+    def update_last_encountered(current_data, new_data):
+        unbroken = np.flatnonzero(
+            DataStorer.sequence_unbroken_filter(current_data).values)
+        matches = DataStorer.matching_rows(
+            current_data.iloc[unbroken], new_data,
+            DataStorer.get_id_columns(new_data)
+        )
 
-    def update_last_encountered(current_data, unbrokens):
-        current_data.loc[
-            DataStorer.sequence_unbroken_filter(current_data),
-            'last_encounted'
-        ] = pd.to_datetime(current_data.loc[
-            DataStorer.sequence_unbroken_filter(current_data),
-            :
-        ].apply(
-            DataStorer.apply_last_enounted, axis=1, reduce=False, args=(
-                unbrokens, DataStorer.get_id_columns(current_data)
-            )
-        ))
+        # The first matching new row gives the last encountered date.
+        first_matches = matches.groupby('x')['y'].min()
+        current_data.iloc[
+            unbroken[first_matches.index.values],
+            current_data.columns.get_loc('last_encounted')
+        ] = new_data['date_scraped'].values[first_matches.values]
         return current_data
 
-    def apply_last_enounted(r, x, cols):
-        identicles = x.loc[
-            DataStorer.identicles_selection(r, x, cols),
-            'date_scraped'
-        ]
-
-        if len(identicles) == 0:
-            return r['last_encounted']
-        else:
-            return identicles.values[0]
-
     def add_new(current_data, new_data):
         id_columns = DataStorer.get_id_columns(new_data)
 
         unbrokens = current_data[
             DataStorer.sequence_unbroken_filter(current_data)
         ]
-
-        new_uniques_filter = new_data.apply(
-            DataStorer.zero_matches, axis=1, reduce=False, args=(
-                unbrokens, id_columns
-            )
-        )
+        matches = DataStorer.matching_rows(new_data, unbrokens, id_columns)
+        new_uniques_filter = np.ones(len(new_data), dtype=bool)
+        new_uniques_filter[matches['x'].values] = False
         new_uniques = new_data[new_uniques_filter].copy()
 
         if new_uniques.empty:
             return current_data
         else:
             new_uniques = DataStorer.reformat_dataframe(new_uniques)
-            updated_data = current_data.append(
-                new_uniques, ignore_index=True, verify_integrity=True
+            updated_data = pd.concat(
+                [current_data, new_uniques],
+                ignore_index=True, verify_integrity=True
             )
             return updated_data
 
@@ -209,20 +232,123 @@ class DataStorer():
 
     def to_ft(df, file_type, file_path):
         if file_type == 'hdf':
-            DataStorer.to_hdf(df, file_path)
+            DataStorer.to_hdf(DataStorer.remove_categoricals(df), file_path)
         elif file_type == 'csv':
             DataStorer.to_csv(df, file_path)
+        elif file_type == 'parquet':
+            DataStorer.to_parquet(df, file_path)
+        elif file_type == 'partitioned_hdf':
+            PartitionedStore.write(
+                DataStorer.remove_categoricals(df), file_path)
         else:
             DataStorer.ft_error(file_type)
 
-    def read_ft(file_type, file_path):
+    def read_ft(file_type, file_path, columns=None):
+        """
+        Read a data file, keeping only `columns` unless it is None, and
+        apply the schema.
+
+        Parquet files also store the Unduplicator's property key, which
+        is only returned if it is asked for in `columns`. It is computed
+        from all of the columns of file types that don't store it.
+        """
+        key = Unduplicator.PROPERTY_KEY
         if file_type == 'hdf':
-            return pd.read_hdf(file_path)
+            df = pd.read_hdf(file_path)
         elif file_type == 'csv':
-            return DataStorer.read_csv(file_path)
+            df = DataStorer.read_csv(file_path)
+        elif file_type == 'parquet':
+            if columns is None or (
+                key in columns and
+                key not in DataStorer.parquet_columns(file_path)
+            ):
+                df = pd.read_parquet(file_path)
+            else:
+                df = pd.read_parquet(file_path, columns=columns)
+        elif file_type == 'partitioned_hdf':
+            df = PartitionedStore.read(file_path)
         else:
             DataStorer.ft_error(file_type)
 
+        if columns is None:
+            if key in df.columns:
+                df = df.drop(key, axis=1)
+        else:
+            if key in columns:
+                df = Unduplicator.with_property_key(df)
+            df = df[columns]
+        return DataStorer.apply_schema(df)
+
+    def parquet_columns(file_path):
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetFile(file_path).schema_arrow.names
+
+    def apply_schema(df, report_size=False):
+        """
+        Store the low cardinality text columns as categoricals and the
+        room counts as float32. The columns of `df` are replaced in place.
+        """
+        if report_size:
+            size = MU.df_size(df)
+        for name in DataStorer.CATEGORICAL_COLUMNS:
+            if name in df.columns and not is_categorical_dtype(df[name]):
+                df[name] = df[name].astype('category')
+        for name in DataStorer.FLOAT32_COLUMNS:
+            if name in df.columns and df[name].dtype != np.float32:
+                df[name] = df[name].astype(np.float32)
+
+        if report_size:
+            print(
+                'Data size %.4fGB, %.4fGB after applying the schema.' %
+                (size, MU.df_size(df))
+            )
+        return df
+
+    def remove_categoricals(df):
+        """HDF files in the fixed format cannot store categoricals."""
+        categoricals = [
+            name for name in df.columns if is_categorical_dtype(df[name])
+        ]
+        if len(categoricals) > 0:
+            df = df.copy()
+            for name in categoricals:
+                df[name] = df[name].astype(object)
+        return df
+
+    def migrate(from_file_type, from_file_path, to_file_type, to_file_path):
+        """
+        Copy a data file to another file type, checking the copy's shape
+        and dtypes, and its contents on a sample of rows.
+        """
+        df = DataStorer.read_ft(from_file_type, from_file_path)
+        # The fixes can add columns, which need the schema like any read.
+        df = DataStorer.apply_schema(DataStorer.maybe_apply_data_fixes(df))
+        DataStorer.to_ft(df, to_file_type, to_file_path)
+
+        migrated = DataStorer.read_ft(to_file_type, to_file_path)
+        if migrated.shape != df.shape:
+            raise RuntimeError(
+                'Migrated data has shape %s, expected %s.' %
+                (str(migrated.shape), str(df.shape))
+            )
+        sample = np.random.RandomState(0).permutation(len(df))[
+            :DataStorer.MIGRATE_CHECK_ROWS]
+        try:
+            pd.testing.assert_frame_equal(
+                migrated.iloc[sample], df.iloc[sample])
+        except AssertionError as e:
+            raise RuntimeError('Migrated data differs: %s' % str(e))
+        print(
+            'Migrated %s data %s to %s: %s.' %
+            (from_file_type, str(df.shape), to_file_type, to_file_path)
+        )
+
+    def ft_exists(file_type, file_path):
+        if file_type == 'partitioned_hdf':
+            return PartitionedStore.exists(file_path)
+        else:
+            return os.path.isfile(file_path)
+
     def ft_error(file_type):
         raise RuntimeError('File type not supported: %s.' % file_type)
 
@@ -232,6 +358,10 @@ class DataStorer():
     def to_csv(df, file_path):
         df.to_csv(file_path)
 
+    def to_parquet(df, file_path):
+        # With the property key stored, merges don't need every column.
+        Unduplicator.with_property_key(df).to_parquet(file_path)
+
     def read_csv(file_path):
         df = pd.read_csv(
             file_path, index_col=0,
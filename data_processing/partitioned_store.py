@@ -0,0 +1,160 @@
+import os
+import pandas as pd
+
+from real_estate.json_load_and_dump import JSONLoadAndDump
+
+
+class PartitionedStore():
+    """
+    Listings stored as one HDF file per state and month first encountered,
+    under a directory with a JSON manifest of the partitions.
+
+    A partition is open while it holds an unbroken sequence. Only open
+    partitions can be changed by an update, so closed partitions are
+    never read or rewritten when new data is added. Reads can be limited
+    to some states and months, or to the open partitions.
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+    UNKNOWN_STATE = 'unknown'
+    UNKNOWN_MONTH = 'unknown'
+    HDF_KEY = 'properties'
+
+    def exists(dir_path):
+        return os.path.isfile(PartitionedStore.manifest_path(dir_path))
+
+    def manifest_path(dir_path):
+        return os.path.join(dir_path, PartitionedStore.MANIFEST_FILE)
+
+    def partition_path(dir_path, key):
+        return os.path.join(dir_path, key + '.h5')
+
+    def load_manifest(dir_path):
+        if PartitionedStore.exists(dir_path):
+            return JSONLoadAndDump.load_from_file(
+                PartitionedStore.manifest_path(dir_path))
+        else:
+            return {}
+
+    def split_key(key):
+        return tuple(key.split('/'))
+
+    def partition_keys(df):
+        states = df['state'].astype(object)
+        states = states.where(
+            states.notnull(), PartitionedStore.UNKNOWN_STATE
+        ).astype(str)
+        months = df['first_encounted'].dt.strftime('%Y-%m')
+        months = months.where(
+            months.notnull(), PartitionedStore.UNKNOWN_MONTH)
+        return states + '/' + months
+
+    def select_keys(manifest, states=None, months=None, open_only=False):
+        keys = []
+        for key in sorted(manifest):
+            state, month = PartitionedStore.split_key(key)
+            if states is not None and state not in states:
+                continue
+            if months is not None and month not in months:
+                continue
+            if open_only and not manifest[key]['open']:
+                continue
+            keys.append(key)
+        return keys
+
+    def read(dir_path, states=None, months=None, open_only=False):
+        """
+        Read the listings in the partitions for `states` and `months`, or
+        all partitions if they are None, as one DataFrame.
+        """
+        manifest = PartitionedStore.load_manifest(dir_path)
+        keys = PartitionedStore.select_keys(
+            manifest, states, months, open_only)
+        return PartitionedStore.read_partitions(dir_path, keys)
+
+    def read_partitions(dir_path, keys):
+        if len(keys) == 0:
+            return pd.DataFrame()
+        return pd.concat(
+            [
+                pd.read_hdf(
+                    PartitionedStore.partition_path(dir_path, key),
+                    PartitionedStore.HDF_KEY
+                )
+                for key in keys
+            ],
+            ignore_index=True
+        )
+
+    def write(df, dir_path):
+        """Write `df` as a new store, replacing any existing partitions."""
+        old_manifest = PartitionedStore.load_manifest(dir_path)
+        manifest = PartitionedStore.write_partitions(df, dir_path, {})
+        for key in old_manifest:
+            if key not in manifest:
+                PartitionedStore.remove_partition(dir_path, key)
+
+    def remove_partition(dir_path, key):
+        file_path = PartitionedStore.partition_path(dir_path, key)
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+        state_dir = os.path.dirname(file_path)
+        if os.path.isdir(state_dir) and len(os.listdir(state_dir)) == 0:
+            os.rmdir(state_dir)
+
+    def write_partitions(df, dir_path, manifest):
+        """
+        Write each partition in `df`, replacing those files, and update
+        and save the manifest.
+        """
+        keys = PartitionedStore.partition_keys(df)
+        for key, partition in df.groupby(keys.values, sort=True):
+            file_path = PartitionedStore.partition_path(dir_path, key)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            partition = partition.reset_index(drop=True)
+            partition.to_hdf(file_path, PartitionedStore.HDF_KEY, append=False)
+            manifest[key] = {
+                'rows': len(partition),
+                'open': bool((partition['sequence_broken'] == False).any())
+            }
+
+        os.makedirs(dir_path, exist_ok=True)
+        PartitionedStore.save_manifest(manifest, dir_path)
+        return manifest
+
+    def save_manifest(manifest, dir_path):
+        # Replaced in one step, so a crash leaves the old or new manifest.
+        manifest_path = PartitionedStore.manifest_path(dir_path)
+        temp_path = manifest_path + '.tmp'
+        JSONLoadAndDump.dump_to_file(manifest, temp_path)
+        os.replace(temp_path, manifest_path)
+
+    def update(dir_path, update_function):
+        """
+        Apply `update_function` to the listings in the open partitions and
+        write back the partitions in its result.
+
+        New listings may fall into a closed partition, which is then read
+        so that it is rewritten with all of its rows.
+        """
+        manifest = PartitionedStore.load_manifest(dir_path)
+        open_keys = PartitionedStore.select_keys(manifest, open_only=True)
+        current_data = PartitionedStore.read_partitions(dir_path, open_keys)
+        updated_data = update_function(current_data)
+
+        updated_keys = set(PartitionedStore.partition_keys(updated_data))
+        reopened_keys = sorted(
+            key for key in updated_keys
+            if key in manifest and key not in open_keys
+        )
+        if len(reopened_keys) > 0:
+            updated_data = pd.concat(
+                [
+                    PartitionedStore.read_partitions(dir_path, reopened_keys),
+                    updated_data
+                ],
+                ignore_index=True
+            )
+
+        PartitionedStore.write_partitions(updated_data, dir_path, manifest)
+        return current_data.shape, updated_data.shape
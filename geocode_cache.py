@@ -0,0 +1,86 @@
+import json
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+from real_estate.key_value_store import SQLiteStore
+
+
+class GeocodeCache(object):
+    """
+    An on-disk cache of geocoding results, keyed by cleaned address.
+
+    Geocoded coordinates are kept for `max_age`, after which the address
+    is geocoded again. Failures are kept for the shorter `failure_max_age`,
+    as they are the results most likely to change when the address index
+    is updated. Call `clear` after rebuilding the index.
+    """
+
+    MAX_AGE = timedelta(days=180)
+    FAILURE_MAX_AGE = timedelta(days=7)
+
+    def __init__(self, file_path, max_age=MAX_AGE,
+                 failure_max_age=FAILURE_MAX_AGE):
+        self.max_age = max_age.total_seconds()
+        self.failure_max_age = failure_max_age.total_seconds()
+        self.geocodes = SQLiteStore(file_path, 'geocodes')
+        self.failures = SQLiteStore(file_path, 'geocode_failures')
+        self.geocodes.delete_older_than(self.max_age)
+        self.failures.delete_older_than(self.failure_max_age)
+        self.hits = 0
+        self.misses = 0
+
+    def key(address):
+        """A key for an address tuple, with nulls as None."""
+        return json.dumps([
+            None if pd.isnull(x) else
+            '%.0f' % x if isinstance(x, (float, np.floating)) else
+            str(x)
+            for x in address
+        ])
+
+    def lookup_many(self, keys):
+        """Return a dict of the cached coordinates for `keys`."""
+        found = self.geocodes.get_many(keys, self.max_age)
+        found.update(self.failures.get_many(keys, self.failure_max_age))
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return dict(
+            (key, GeocodeCache.decode(coords)) for key, coords in found.items()
+        )
+
+    def update_many(self, items):
+        items = [(key, GeocodeCache.encode(coords)) for key, coords in items]
+        self.geocodes.put_many(item for item in items if item[1][2])
+        self.failures.put_many(item for item in items if not item[1][2])
+
+    def encode(coords):
+        latitude, longitude, is_valid = coords
+        return [
+            None if pd.isnull(latitude) else float(latitude),
+            None if pd.isnull(longitude) else float(longitude),
+            bool(is_valid)
+        ]
+
+    def decode(coords):
+        latitude, longitude, is_valid = coords
+        return [
+            np.NaN if latitude is None else latitude,
+            np.NaN if longitude is None else longitude,
+            is_valid
+        ]
+
+    def clear(self):
+        self.geocodes.delete_older_than(0)
+        self.failures.delete_older_than(0)
+
+    def report(self):
+        lookups = self.hits + self.misses
+        print(
+            'Geocode cache: %i of %i unique addresses found (%.1f%%).'
+            % (self.hits, lookups, 100 * self.hits / max(lookups, 1))
+        )
+
+    def close(self):
+        self.geocodes.close()
+        self.failures.close()
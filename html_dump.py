@@ -0,0 +1,136 @@
+import os
+import gzip
+import json
+import threading
+
+
+class HTMLDump(object):
+    """
+    An append-only, gzip compressed HTML dump with one JSON record per line.
+
+    Pages are written as they are retrieved and read back with a generator,
+    so neither side has to hold the whole scrape in memory. Records are
+    flushed in batches of `flush_every` and on close, so a dump can be read
+    up to its last flushed record even if the writer died.
+    """
+
+    FLUSH_EVERY = 100
+
+    def __init__(self, file_path, flush_every=FLUSH_EVERY):
+        self.file_path = file_path
+        self.file = None
+        self.lock = threading.Lock()
+        self.flush_every = flush_every
+        self.unflushed = 0
+        self.flush_callbacks = []
+
+    def __enter__(self):
+        self.file = gzip.open(self.file_path, 'ab')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        self.file.close()
+        self.file = None
+
+    def write_record(self, record):
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        with self.lock:
+            self.file.write(line)
+            self.unflushed += 1
+            if self.unflushed >= self.flush_every:
+                self.flush_unlocked()
+
+    def when_flushed(self, callback):
+        """Call `callback` once every record written so far is flushed."""
+        with self.lock:
+            if self.unflushed == 0:
+                callback()
+            else:
+                self.flush_callbacks.append(callback)
+
+    def flush(self):
+        with self.lock:
+            self.flush_unlocked()
+
+    def flush_unlocked(self):
+        self.file.flush()
+        self.unflushed = 0
+        callbacks, self.flush_callbacks = self.flush_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def write_description(self, search_description):
+        self.write_record({'search_description': search_description})
+
+    def write_page(self, page):
+        self.write_record(page)
+
+    def write_pages(self, pages):
+        for page in pages:
+            self.write_page(page)
+
+    def make_page(html, url, page_number, postcode=None, state=None,
+                  unchanged=False):
+        return {
+            'url': url,
+            'page_number': page_number,
+            'postcode': postcode,
+            'state': state,
+            'unchanged': unchanged,
+            'html': html,
+        }
+
+    def read_records(file_path):
+        for line in HTMLDump.read_lines(file_path):
+            if not line.endswith(b'\n'):
+                # A partially written final record.
+                break
+            yield json.loads(line.decode('utf-8'))
+
+    def read_lines(file_path):
+        with gzip.open(file_path, 'rb') as f:
+            try:
+                for line in f:
+                    yield line
+            except EOFError:
+                # The writer died before the end of the gzip stream was
+                # written; everything before this point is intact.
+                pass
+
+    def is_intact(file_path):
+        with gzip.open(file_path, 'rb') as f:
+            try:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        return False
+            except EOFError:
+                return False
+        return True
+
+    def repair(file_path):
+        """
+        Rewrite a dump whose writer died, keeping its complete records, so
+        that it can be appended to again. Returns True if it was damaged.
+        """
+        if HTMLDump.is_intact(file_path):
+            return False
+
+        temp_file_path = file_path + '.repair'
+        with gzip.open(temp_file_path, 'wb') as f:
+            for record in HTMLDump.read_records(file_path):
+                f.write((json.dumps(record) + '\n').encode('utf-8'))
+        os.replace(temp_file_path, file_path)
+        return True
+
+    def read_pages(file_path, skip_unchanged=False):
+        for record in HTMLDump.read_records(file_path):
+            if 'html' not in record:
+                continue
+            if skip_unchanged and record.get('unchanged'):
+                continue
+            yield record
+
+    def read_htmls(file_path, skip_unchanged=False):
+        for page in HTMLDump.read_pages(file_path, skip_unchanged):
+            yield page['html']
@@ -0,0 +1,102 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CountingAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter that keeps each connection pool it sends requests
+    through, so that their connection counts outlast eviction from the
+    pool manager.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.pools_lock = threading.Lock()
+        self.used_pools = {}
+        super().__init__(*args, **kwargs)
+
+    def get_connection_with_tls_context(self, *args, **kwargs):
+        return self.keep_pool(
+            super().get_connection_with_tls_context(*args, **kwargs))
+
+    def get_connection(self, *args, **kwargs):
+        return self.keep_pool(super().get_connection(*args, **kwargs))
+
+    def keep_pool(self, pool):
+        with self.pools_lock:
+            self.used_pools[id(pool)] = pool
+        return pool
+
+    def connection_counts(self):
+        """Return the number of connections opened and requests made."""
+        with self.pools_lock:
+            pools = list(self.used_pools.values())
+        return (
+            sum(pool.num_connections for pool in pools),
+            sum(pool.num_requests for pool in pools)
+        )
+
+
+class PooledSession(object):
+    """
+    A keep-alive HTTP session with pooled connections.
+
+    Counts the connections opened and the connections reused, including
+    those from pools that urllib3 has already evicted.
+    """
+
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 10
+    TIMEOUT = 1
+
+    SHARED = None
+
+    def __init__(self, pool_connections, pool_maxsize, timeout):
+        self.timeout = timeout
+        self.adapter = CountingAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def from_settings(settings):
+        return PooledSession(
+            settings.http_pool_connections,
+            settings.http_pool_maxsize,
+            settings.http_timeout
+        )
+
+    def shared():
+        if PooledSession.SHARED is None:
+            PooledSession.SHARED = PooledSession(
+                PooledSession.POOL_CONNECTIONS,
+                PooledSession.POOL_MAXSIZE,
+                PooledSession.TIMEOUT
+            )
+        return PooledSession.SHARED
+
+    def set_shared(session):
+        PooledSession.SHARED = session
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def connection_counts(self):
+        """Return the number of connections (opened, reused)."""
+        opened, requests_made = self.adapter.connection_counts()
+        return opened, requests_made - opened
+
+    def report(self):
+        opened, reused = self.connection_counts()
+        print(
+            'HTTP connections: %i opened, %i reused.' % (opened, reused)
+        )
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,72 @@
+import time
+import json
+import sqlite3
+import threading
+
+
+class SQLiteStore(object):
+    """
+    A persistent key-value store of JSON values, held in a SQLite table.
+
+    Each value is stored with the time it was written, so that callers can
+    ignore or delete values older than a maximum age.
+    """
+
+    # SQLite's default limit on the number of variables in a query is 999.
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self, file_path, table):
+        self.file_path = file_path
+        self.table = table
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS %s ('
+                'key TEXT PRIMARY KEY, value TEXT, stored REAL)' % self.table
+            )
+
+    def get_many(self, keys, max_age=None):
+        """Return a dict of the values stored for `keys`."""
+        keys = list(keys)
+        oldest = None if max_age is None else time.time() - max_age
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), self.QUERY_CHUNK_SIZE):
+                chunk = keys[i:i + self.QUERY_CHUNK_SIZE]
+                rows = self.connection.execute(
+                    'SELECT key, value, stored FROM %s WHERE key IN (%s)'
+                    % (self.table, ', '.join('?' * len(chunk))),
+                    chunk
+                )
+                for key, value, stored in rows:
+                    if oldest is None or stored >= oldest:
+                        found[key] = json.loads(value)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO %s VALUES (?, ?, ?)' % self.table,
+                    ((key, json.dumps(value), now) for key, value in items)
+                )
+
+    def delete_older_than(self, max_age):
+        with self.lock:
+            with self.connection:
+                cursor = self.connection.execute(
+                    'DELETE FROM %s WHERE stored < ?' % self.table,
+                    (time.time() - max_age,)
+                )
+        return cursor.rowcount
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM %s' % self.table
+            ).fetchone()[0]
+
+    def close(self):
+        self.connection.close()
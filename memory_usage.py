@@ -19,6 +19,9 @@ class MU():
     def get_pid():
         return os.getpid()
 
+    def gb_pid():
+        return MU.pmu(), MU.get_pid()
+
     def memory_available():
         mem = psutil.virtual_memory().available
         return mem
@@ -33,7 +36,7 @@ class MU():
         return MU.to_gb(sys.getsizeof(x))
 
     def df_size(x):
-        return MU.to_gb(x.memory_usage(index=True).values.sum())
+        return MU.to_gb(x.memory_usage(index=True, deep=True).values.sum())
 
     def print_memory_usage(prefix=None):
         if prefix is not None:
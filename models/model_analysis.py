@@ -14,6 +14,7 @@ from scipy.stats import gaussian_kde
 from real_estate.data_processing.data_analysis import DataAnalysis
 from real_estate.data_processing.data_storer import DataStorer
 from real_estate.models.xy import XY
+from real_estate.models.unduplicator import IncrementalUnduplicator
 from real_estate.models.model_spec_optimisation_plotter import (
     ModelSpecOptimisationPlotter)
 
@@ -26,10 +27,20 @@ class ModelAnalysis():
         data_file_path, file_type,
         xy_class, model_class,
         scatter_lims, error_density_lims,
-        outputs_dir
+        outputs_dir, perform_merges=True, unduplicator_state_file=None
     ):
-        data = DataStorer.read_ft(file_type, data_file_path)
-        xy = ModelAnalysis.make_xy(data, xy_class)
+        """
+        If `unduplicator_state_file` is given, the merges reuse the results
+        saved there by the last run for the properties that haven't changed.
+        """
+        if unduplicator_state_file is not None:
+            xy_class.INCREMENTAL_UNDUPLICATOR = IncrementalUnduplicator(
+                unduplicator_state_file)
+        data = DataStorer.read_ft(
+            file_type, data_file_path,
+            ModelAnalysis.data_columns(xy_class, perform_merges)
+        )
+        xy = ModelAnalysis.make_xy(data, xy_class, perform_merges)
 
         ModelAnalysis.model_analysis(
             data, xy,
@@ -37,8 +48,13 @@ class ModelAnalysis():
             outputs_dir
         )
 
-    def make_xy(data, xy_class):
-        return xy_class(data, xy_class.GENERIC_X_SPEC)
+    def data_columns(xy_class, perform_merges):
+        columns = XY.data_columns(
+            xy_class, xy_class.GENERIC_X_SPEC, perform_merges)
+        return list(dict.fromkeys(columns + [ModelAnalysis.DATE_COLUMN]))
+
+    def make_xy(data, xy_class, perform_merges=True):
+        return xy_class(data, xy_class.GENERIC_X_SPEC, perform_merges)
 
     def write_xy(xy, dir, file_name):
         for df, a in ((xy.X, 'X'), (xy.y, 'y')):
@@ -1,6 +1,8 @@
+import os
 from datetime import timedelta
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_categorical_dtype
 
 
 class DataValidationError(ValueError):
@@ -30,8 +32,10 @@ class Unduplicator():
         'price_min', 'price_max', 'sequence_broken',
         FIRST_ENCOUNTERED, LAST_ENCOUNTERED
     ]
+    PROPERTY_KEY = 'property_key'
 
     def check_and_unduplicate(df):
+        df = Unduplicator.with_property_key(df)
         df = Unduplicator.sort_df_by_property_columns_and(
             df, Unduplicator.ENCOUNTEREDS)
         Unduplicator.check_ordering_of_listings(df)
@@ -45,7 +49,7 @@ class Unduplicator():
         return df
 
     def unduplicate(df):
-        df = df.copy()
+        df = Unduplicator.with_property_key(df).copy()
         df['listings_subgroups'] = Unduplicator.make_subgroups_series(df)
 
         values = Unduplicator.get_le_and_sb_values(df)
@@ -60,7 +64,8 @@ class Unduplicator():
         filtered_df['sequence_broken'] = values['sequence_broken']
         filtered_df['price_min'] = values['price_min']
         filtered_df['price_max'] = values['price_max']
-        filtered_df = filtered_df.drop('listings_subgroups', axis=1)
+        filtered_df = filtered_df.drop(
+            ['listings_subgroups', Unduplicator.PROPERTY_KEY], axis=1)
         return filtered_df.sort_index()
 
     def get_le_and_sb_values(df):
@@ -114,7 +119,59 @@ class Unduplicator():
         return df.sort_values(by=by, inplace=False)
 
     def property_columns(df):
-        return df.columns.difference(Unduplicator.NON_PROPERTY_COLUMNS)
+        """
+        The columns that identify a property, which is just the property
+        key once it has been added.
+        """
+        if Unduplicator.PROPERTY_KEY in df.columns:
+            return pd.Index([Unduplicator.PROPERTY_KEY])
+        else:
+            return df.columns.difference(
+                Unduplicator.NON_PROPERTY_COLUMNS + [Unduplicator.PROPERTY_KEY])
+
+    def with_property_key(df):
+        if Unduplicator.PROPERTY_KEY in df.columns:
+            return df
+        df = df.copy()
+        df[Unduplicator.PROPERTY_KEY] = Unduplicator.property_keys(df)
+        return df
+
+    def get_property_keys(df):
+        if Unduplicator.PROPERTY_KEY in df.columns:
+            return df[Unduplicator.PROPERTY_KEY].values
+        else:
+            return Unduplicator.property_keys(df)
+
+    def property_keys(df):
+        """
+        A 64 bit hash of each row's property columns, with nulls equal to
+        nulls. If two different properties share a hash, the properties
+        are numbered exactly instead.
+        """
+        columns = list(Unduplicator.property_columns(df))
+        keys = pd.util.hash_pandas_object(df[columns], index=False).values
+        if Unduplicator.has_collisions(df, columns, keys):
+            print('Property key collision, numbering the properties instead.')
+            keys = df.groupby(
+                columns, dropna=False, sort=False
+            ).ngroup().values.astype(np.uint64)
+        return keys
+
+    def has_collisions(df, columns, keys):
+        # Compare each row with the first row that has the same key.
+        _, first, inverse = np.unique(
+            keys, return_index=True, return_inverse=True)
+        representatives = first[inverse]
+        for name in columns:
+            a = df[name].values
+            b = a.take(representatives)
+            equal = (a == b) | (pd.isnull(a) & pd.isnull(b))
+            if not np.all(equal):
+                return True
+        return False
+
+    def row_hashes(df):
+        return pd.util.hash_pandas_object(df, index=False).values
 
     def check_ordering_of_listings(df):
         property_columns = Unduplicator.property_columns(df)
@@ -182,10 +239,133 @@ class Unduplicator():
                 'Rows that failed the check:\n%s' % str(df[fe_gt_le])
             )
 
+class IncrementalUnduplicator(object):
+    """
+    Unduplicate data that changes a little between runs.
+
+    Listings are only merged with other listings of the same property, so
+    each property can be unduplicated on its own. The last result is kept
+    along with an id for every input row, made of the row's property key,
+    a hash of the row and the number of identical rows before it. On the
+    next run only the properties with a new, changed or removed row are
+    unduplicated again, and the rest of the last result is reused. Rows
+    are matched between runs on their ids, so the data's index can change,
+    as it does when a partitioned store is read.
+
+    If `state_file` is given, the state is loaded from it and saved to it
+    after each run.
+    """
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file
+        self.columns = None
+        self.rows = None
+        self.unduplicated = None
+        self.sources = None
+        self.touched = 0
+        if state_file is not None and os.path.isfile(state_file):
+            self.load()
+
+    def unduplicate(self, df):
+        if not df.index.is_unique:
+            return Unduplicator.check_and_unduplicate(df)
+        rows = IncrementalUnduplicator.row_ids(df)
+
+        if self.can_reuse(df):
+            touched_keys = self.touched_keys(rows)
+            keep = ~ np.isin(self.sources['property_key'].values, touched_keys)
+            sources = self.sources[keep]
+            # Reused rows take the index of the rows they came from.
+            positions = pd.MultiIndex.from_frame(rows).get_indexer(
+                pd.MultiIndex.from_frame(sources))
+            unduplicated = self.unduplicated[keep].set_axis(
+                df.index[positions], axis=0)
+        else:
+            touched_keys = np.unique(rows['property_key'].values)
+            unduplicated = df.iloc[:0].drop(
+                columns=[Unduplicator.PROPERTY_KEY], errors='ignore')
+            sources = rows.iloc[:0]
+
+        touched_rows = np.isin(rows['property_key'].values, touched_keys)
+        if touched_rows.any():
+            recomputed = Unduplicator.check_and_unduplicate(df[touched_rows])
+            unduplicated = pd.concat([unduplicated, recomputed])
+            sources = pd.concat([
+                sources, rows.iloc[df.index.get_indexer(recomputed.index)]
+            ])
+
+        order = np.argsort(unduplicated.index.values, kind='mergesort')
+        self.unduplicated = IncrementalUnduplicator.restore_dtypes(
+            unduplicated.iloc[order].copy(), df)
+        self.sources = sources.iloc[order].reset_index(drop=True)
+        self.columns = list(df.columns)
+        self.rows = rows
+        self.touched = len(touched_keys)
+        if self.state_file is not None:
+            self.save()
+
+        print(
+            'Unduplicated %i of %i properties.' %
+            (self.touched, len(np.unique(rows['property_key'].values)))
+        )
+        return self.unduplicated.copy()
+
+    def row_ids(df):
+        rows = pd.DataFrame({
+            'property_key': Unduplicator.get_property_keys(df),
+            'row_hash': Unduplicator.row_hashes(df),
+        })
+        rows['occurrence'] = rows.groupby(
+            ['property_key', 'row_hash']).cumcount().values
+        return rows
+
+    def can_reuse(self, df):
+        return (
+            self.unduplicated is not None and
+            self.columns == list(df.columns)
+        )
+
+    def touched_keys(self, rows):
+        """The keys of properties with rows that changed since the last run."""
+        ids = pd.MultiIndex.from_frame(rows)
+        old_ids = pd.MultiIndex.from_frame(self.rows)
+        return np.unique(np.concatenate([
+            rows['property_key'].values[~ ids.isin(old_ids)],
+            self.rows['property_key'].values[~ old_ids.isin(ids)],
+        ]))
+
+    def restore_dtypes(unduplicated, df):
+        # Concatenating categoricals with different categories gives objects.
+        for name in df.columns:
+            if (is_categorical_dtype(df[name]) and
+                    unduplicated[name].dtype != df[name].dtype):
+                unduplicated[name] = unduplicated[name].astype(df[name].dtype)
+        return unduplicated
+
+    def save(self):
+        pd.to_pickle(
+            {
+                'columns': self.columns,
+                'rows': self.rows,
+                'unduplicated': self.unduplicated,
+                'sources': self.sources,
+            },
+            self.state_file
+        )
+
+    def load(self):
+        state = pd.read_pickle(self.state_file)
+        self.columns = state['columns']
+        self.rows = state['rows']
+        self.unduplicated = state['unduplicated']
+        self.sources = state['sources']
+
+
 class ListingsSubgrouper():
     def group(df):
-        pcs = Unduplicator.property_columns(df)
-        eq_prev = (df[pcs] == df[pcs].shift(1)).all(axis=1)
+        keys = Unduplicator.get_property_keys(df)
+        eq_prev = pd.Series(
+            np.concatenate([[False], keys[1:] == keys[:-1]]), index=df.index)
         time_diff = df['first_encounted'].subtract(df['last_encounted'].shift(1))
         gt_max = time_diff > Unduplicator.MAX_TIME_DIFF
 
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from pandas.api.types import is_categorical_dtype
 from sklearn import preprocessing
 from real_estate.models.unduplicator import Unduplicator
 
@@ -60,9 +61,36 @@ class XY(object):
     MINIMUM_SUBURB_POPULATION = None
     EPOCH = np.datetime64('2017-11-09')
 
+    # An IncrementalUnduplicator to reuse between runs, or None.
+    INCREMENTAL_UNDUPLICATOR = None
+
     DO_NAN_REPLACEMENTS = True
     NAN_REPLACEMENTS = ('bathrooms', 'bedrooms', 'garage_spaces')
 
+    FILTER_COLUMNS = [
+        'sale_type', 'price_min', 'price_max',
+        'suburb', 'bedrooms', 'bathrooms', 'garage_spaces',
+    ]
+
+    def data_columns(xy_class, x_spec, perform_merges=True):
+        """
+        The data columns used by `xy_class` with `x_spec`. Merges use the
+        Unduplicator's property key in place of the columns it hashes.
+        """
+        columns = list(xy_class.FILTER_COLUMNS)
+        if xy_class.EXCLUDE_INVALID_GEOCODINGS:
+            columns.append('geocoding_is_valid')
+        columns += XY.reduce_tuples(
+            [a for a, b in x_spec if b != 'linear_by_categorical']
+        )
+        columns += XY.reduce_tuples(
+            [a for a, b in x_spec if b == 'linear_by_categorical']
+        )
+        if perform_merges:
+            columns += Unduplicator.NON_PROPERTY_COLUMNS
+            columns.append(Unduplicator.PROPERTY_KEY)
+        return list(dict.fromkeys(columns))
+
     def setup_self(
         self, df, x_spec, perform_merges,
     ):
@@ -71,7 +99,7 @@ class XY(object):
         df = self.filter_data(df)
 
         if self.perform_merges:
-            df = Unduplicator.check_and_unduplicate(df)
+            df = self.unduplicate(df)
 
         if self.DO_NAN_REPLACEMENTS:
             df = self.replace_nans(df)
@@ -88,6 +116,12 @@ class XY(object):
             self.categorical_groups, self.by_categorical_groups, self.ne_groups
         )
 
+    def unduplicate(self, df):
+        if self.INCREMENTAL_UNDUPLICATOR is None:
+            return Unduplicator.check_and_unduplicate(df)
+        else:
+            return self.INCREMENTAL_UNDUPLICATOR.unduplicate(df)
+
     def replace_nans(self, df):
         print('Performing nan replacment:')
         for c in self.NAN_REPLACEMENTS:
@@ -242,8 +276,16 @@ class XY(object):
             X[categorical] == self.CATEGORICALS_EXCLUSIONS[categorical],
             categorical
         ] = np.NaN
+        X[categorical] = XY.remove_unused_categories(X[categorical])
         return X
 
+    def remove_unused_categories(series):
+        # Dummies are made for every category, including those filtered out.
+        if is_categorical_dtype(series):
+            return series.cat.remove_unused_categories()
+        else:
+            return series
+
     def prep_ordinal(self, ordinal, X):
         X.loc[X[ordinal] == self.ORDINAL_EXCLUDE, ordinal] = np.NaN
         X.loc[X[ordinal] > self.ORDINAL_MAX, ordinal] = self.ORDINAL_MAX
@@ -259,6 +301,7 @@ class XY(object):
 
     def prep_linear_by_categorical(self, linear_by_categorical, X):
         linear, categorical = linear_by_categorical
+        X[categorical] = XY.remove_unused_categories(X[categorical])
         dummies = pd.get_dummies(
             X[[categorical]], prefix=linear,
             prefix_sep='_by_', columns=[categorical],
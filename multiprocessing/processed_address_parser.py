@@ -1,40 +1,232 @@
-from time import sleep
+import atexit
 import multiprocessing
+import multiprocessing.connection
+from collections import deque
+from itertools import count, islice
 import real_estate.real_estate_property as rep
 from real_estate.memory_usage import MU
 
 
-class PAP():
-    def parse(properties):
-        address_strings = [p.address_text.string for p in properties]
+def import_parser(postprocessing_file=None):
+    print('Importing address parser. %.4fGB, pid %i' % MU.gb_pid())
+    from real_estate.address_parser import RealEstateAddressParser
+    print('Imported address parser. %.4fGB, pid %i' % MU.gb_pid())
+    if postprocessing_file is None:
+        return RealEstateAddressParser()
+    return RealEstateAddressParser(postprocessing_file)
+
+
+class ParserWorker(object):
+    def __init__(self, parser_factory):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=ParserWorker.run,
+            args=(child_connection, parser_factory),
+            daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        self.ready = False
+        self.batch = None
+
+    def run(connection, parser_factory):
+        parser = parser_factory()
+        connection.send(('ready', None))
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                return
+            if message is None:
+                return
+            batch_id, strings = message
+            connection.send(
+                (batch_id, parser.parse_and_validate_addresses(strings)))
+
+    def send(self, batch):
+        self.batch = batch
+        batch_id, strings, _ = batch
+        self.connection.send((batch_id, strings))
+
+    def stop(self, timeout=5):
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+
+class ParserWorkerPool(object):
+    """
+    A persistent pool of address parsing processes.
 
-        q = multiprocessing.Queue()
-        p = multiprocessing.Process(
-            target=PAP.import_and_parse, args=(q, address_strings)
+    Each worker imports libpostal once and then parses batches of strings
+    sent over a pipe, so the import cost is paid when the pool starts
+    rather than on every call. Each worker has at most one batch in
+    flight, and batches are only taken from the input as workers become
+    free. A worker that dies is restarted and its batch is retried, up to
+    MAX_BATCH_ATTEMPTS times.
+    """
+
+    # Each worker loads libpostal, which takes several GB.
+    PROCESSES = 1
+    BATCH_SIZE = 500
+    MAX_BATCH_ATTEMPTS = 3
+
+    def __init__(self, processes=None, batch_size=BATCH_SIZE,
+                 parser_factory=import_parser):
+        if processes is None:
+            processes = ParserWorkerPool.PROCESSES
+        self.processes = processes
+        self.batch_size = batch_size
+        self.parser_factory = parser_factory
+        self.workers = []
+
+    def from_settings(settings, parser_factory=import_parser):
+        return ParserWorkerPool(
+            settings.address_parser_processes,
+            parser_factory=parser_factory
+        )
+
+    def start(self):
+        while len(self.workers) < self.processes:
+            self.workers.append(ParserWorker(self.parser_factory))
+
+    def parse(self, strings):
+        """Parse and validate `strings`, returning results in input order."""
+        self.start()
+        batches = self.batches(strings)
+        retries = deque()
+        results = {}
+        exhausted = False
+        try:
+            while True:
+                for worker in self.workers:
+                    if not worker.ready or worker.batch is not None:
+                        continue
+                    if retries:
+                        worker.send(retries.popleft())
+                    elif not exhausted:
+                        batch = next(batches, None)
+                        exhausted = batch is None
+                        if not exhausted:
+                            worker.send(batch)
+
+                if exhausted and len(retries) == 0 and all(
+                    w.batch is None for w in self.workers
+                ):
+                    break
+                self.receive(results, retries)
+        except BaseException:
+            self.close()
+            raise
+        return [c for batch_id in sorted(results) for c in results[batch_id]]
+
+    def batches(self, strings):
+        strings = iter(strings)
+        for batch_id in count():
+            batch = list(islice(strings, self.batch_size))
+            if len(batch) == 0:
+                return
+            yield [batch_id, batch, 0]
+
+    def receive(self, results, retries):
+        ready = multiprocessing.connection.wait(
+            [w.connection for w in self.workers] +
+            [w.process.sentinel for w in self.workers]
         )
+        for i, worker in enumerate(self.workers):
+            if worker.connection in ready:
+                try:
+                    batch_id, components = worker.connection.recv()
+                except EOFError:
+                    self.restart(i, retries)
+                    continue
+
+                if batch_id == 'ready':
+                    worker.ready = True
+                else:
+                    results[batch_id] = components
+                    worker.batch = None
+            elif worker.process.sentinel in ready:
+                self.restart(i, retries)
+
+    def restart(self, i, retries):
+        worker = self.workers[i]
+        worker.process.join()
+        worker.connection.close()
+        if not worker.ready:
+            raise RuntimeError(
+                'Address parser worker %i died while starting, exit code %s.'
+                % (worker.process.pid, worker.process.exitcode)
+            )
         print(
-            'Starting separate process for parsing addresses. %.4fGB, pid %i'
-            % MU.gb_pid()
+            'Address parser worker %i died, exit code %s. Restarting it.'
+            % (worker.process.pid, worker.process.exitcode)
         )
-        p.start()
-        r = PAP.get_results(p, q)
-        p.join()
-        print('Separate process finished. %.4fGB, pid %i' % MU.gb_pid())
 
-        PAP.ensure_queue_is_empty(q)
+        if worker.batch is not None:
+            worker.batch[2] += 1
+            if worker.batch[2] >= self.MAX_BATCH_ATTEMPTS:
+                raise RuntimeError(
+                    'Address parser workers died %i times on batch %i.'
+                    % (worker.batch[2], worker.batch[0])
+                )
+            retries.appendleft(worker.batch)
+        self.workers[i] = ParserWorker(self.parser_factory)
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class PAP():
+    WORKER_POOL = None
+
+    def configure_from_settings(settings):
+        PAP.set_worker_pool(ParserWorkerPool.from_settings(settings))
+
+    def worker_pool():
+        if PAP.WORKER_POOL is None:
+            PAP.set_worker_pool(ParserWorkerPool())
+        return PAP.WORKER_POOL
+
+    def set_worker_pool(pool):
+        if PAP.WORKER_POOL is not None:
+            PAP.WORKER_POOL.close()
+        PAP.WORKER_POOL = pool
+        atexit.register(pool.close)
+
+    def parse(properties):
+        address_strings = [p.address_text.string for p in properties]
+        print('Parsing addresses. %.4fGB, pid %i' % MU.gb_pid())
+        r = PAP.worker_pool().parse(address_strings)
+        print('Parsing complete. %.4fGB, pid %i' % MU.gb_pid())
         properties = PAP.populate_addresses(properties, r)
         return properties
 
     def parse__(properties):
         address_strings = [p.address_text.string for p in properties]
         PAP.dump_strings(address_strings)
-        r = PAP.import_and_parse(None, address_strings)
+        r = PAP.worker_pool().parse(address_strings)
         properties = PAP.populate_addresses(properties, r)
         return properties
 
     def parse_from_json():
         address_strings = PAP.load_strings()
-        r = PAP.import_and_parse(None, address_strings)
+        r = PAP.worker_pool().parse(address_strings)
         # properties = PAP.populate_addresses(properties, r)
         return r
 
@@ -50,47 +242,11 @@ class PAP():
         print('loaded %i strings to %s.' % (len(strings), PAP.FN))
         return strings
 
-    def get_results(p, q):
-        r = None
-        while True:
-            sleep(0.1)
-            q_empty = q.empty()
-            p_is_alive = p.is_alive()
-            if not q_empty:
-                r = q.get()
-                break
-            elif not p_is_alive and r is not None:
-                break
-            elif not p_is_alive:
-                raise RuntimeError(
-                    'p died without adding to the queue - exit code was %i.'
-                    % p.exitcode
-                )
-        return r
-
     def populate_addresses(properties, r):
         for p, components in zip(properties, r):
             p.populate_address(PAP.maybe_create_address(components))
         return properties
 
-    def ensure_queue_is_empty(q):
-        if q.empty() is False:
-            raise RuntimeError('Some results were left in the Queue.')
-
-    def import_and_parse(q, strings):
-        print('Importing address parser. %.4fGB, pid %i' % MU.gb_pid())
-        from real_estate.address_parser import RealEstateAddressParser
-        print('Imported address parser. %.4fGB, pid %i' % MU.gb_pid())
-        parser = RealEstateAddressParser()
-        components = PAP.parse_addresses(parser, strings)
-        print('Parsing complete. %.4fGB, pid %i' % MU.gb_pid())
-        q.put(components)
-        print('Added components to the queue. %.4fGB, pid %i' % MU.gb_pid())
-        return components
-
-    def parse_addresses(parser, strings):
-        return [parser.parse_and_validate_address(s) for s in strings]
-
     def maybe_create_address(address_components):
         if type(address_components) is rep.AddressParseFailed:
             return address_components
@@ -1,58 +1,42 @@
-from time import sleep
 import multiprocessing
-import queue
+from functools import partial
+from itertools import islice
 
-from real_estate.website_scraper import WebsiteScraper
 
+class PPS():
+    """
+    Scrape pages into properties across a pool of worker processes.
 
-# Todo: joinable queue?
+    Pages are sharded into batches of PAGES_PER_SHARD, so each worker sends
+    back one pickled list of properties per shard rather than one message
+    per property. Shards are consumed lazily, so `pages` can be a generator
+    over an HTML dump.
+    """
 
-class PPS():
-    def make_properties(q1, q2, assistant):
+    PAGES_PER_SHARD = 100
+
+    def processed_make_properties(assistant, processes=None):
         pages = assistant.load_pages()
-        properties = assistant.scraper.scrape_pages(pages)
-        num_properties = len(properties)
-        q1.put(num_properties)
-        for i, v in enumerate(properties):
-            sleep(0.01)
-            # q2.put((i, v), timeout=60)
-            try:
-                q2.put_nowait((i, v))
-            except:
-                print('Put failed at number %i.' % i)
-                raise
-
-    def get_results(p, q):
-        results = []
+        return PPS.scrape_pages(assistant.scraper, pages, processes)
+
+    def scrape_pages(scraper, pages, processes=None,
+                     pages_per_shard=PAGES_PER_SHARD):
+        properties = []
+        with multiprocessing.Pool(processes) as pool:
+            for batch in pool.imap(
+                partial(PPS.scrape_shard, scraper),
+                PPS.shard(pages, pages_per_shard)
+            ):
+                properties += batch
+        return properties
+
+    def scrape_shard(scraper, pages):
+        return scraper.scrape_pages(pages)
+
+    def shard(pages, pages_per_shard):
+        pages = iter(pages)
         while True:
-            # sleep(0.01)
-            p_is_alive = p.is_alive()
-            try:
-                i, r = q.get_nowait()
-                results.append(r)
-                # print(i)
-            except queue.Empty:
-                if not p_is_alive:
-                    print('BREAKING at number %i' % i)
-                    break
-                sleep(0.1)
-        return results
-
-    def processed_make_properties(assistant):
-        q1 = multiprocessing.Queue()
-        q2 = multiprocessing.Queue()
-        p = multiprocessing.Process(
-            target=Kip.make_properties, args=(q1, q2, assistant)
-        )
-        p.start()
-        num_properties = q1.get()
-        r = Kip.get_results(p, q2)
-        p.join()
-
-        if len(r) != num_properties:
-            raise RuntimeError(
-                "Didn't recieve all of the properties - %i of %i"
-                % (len(r), num_properties)
-            )
-        print((len(r), num_properties))
-        return r
+            shard = list(islice(pages, pages_per_shard))
+            if len(shard) == 0:
+                return
+            yield shard
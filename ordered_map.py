@@ -0,0 +1,21 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class OrderedMap():
+    """Map a function over items on a thread pool, keeping their order."""
+
+    def map(fn, items, max_workers):
+        """
+        Map `fn` over `items` with `max_workers` threads, yielding results
+        in order. Items are submitted lazily, at most two per worker ahead
+        of the results.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = deque()
+            for item in items:
+                futures.append(executor.submit(fn, item))
+                if len(futures) >= 2 * max_workers:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
@@ -0,0 +1,118 @@
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from datetime import timedelta
+
+
+class PageCache(object):
+    """
+    An on-disk cache of result pages keyed by URL, for conditional GETs.
+
+    Each entry stores the page's ETag and Last-Modified validators, a hash of
+    its content and a compressed copy of it. A page is unchanged if the
+    server answers 304 Not Modified or sends back content with the same
+    hash. Entries older than `max_age` are refreshed unconditionally and
+    count as changed, so the listings on an unchanged page are still
+    re-encountered well within DataStorer's sequence breaking window,
+    though their last_encounted can be up to `max_age` out of date.
+    """
+
+    MAX_AGE = timedelta(days=7)
+
+    def __init__(self, file_path, max_age=MAX_AGE):
+        self.file_path = file_path
+        self.max_age = max_age.total_seconds()
+        self.lock = threading.Lock()
+        self.unchanged_urls = set()
+        self.requests = 0
+
+        self.connection = sqlite3.connect(file_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, '
+                'content_hash TEXT, html BLOB, refreshed REAL)'
+            )
+
+    def lookup(self, url):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT etag, last_modified, content_hash, html, refreshed '
+                'FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+
+        if row is None or time.time() - row[4] > self.max_age:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'content_hash': row[2],
+            'html': row[3],
+            'refreshed': row[4],
+        }
+
+    def conditional_headers(self, url):
+        entry = self.lookup(url)
+        headers = {}
+        if entry is not None:
+            if entry['etag'] is not None:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified'] is not None:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, url, response):
+        """Record `response` for `url` and return the page's HTML."""
+        entry = self.lookup(url)
+        if response.status_code == 304 and entry is not None:
+            html = zlib.decompress(entry['html']).decode('utf-8')
+            unchanged = True
+        else:
+            html = response.text
+            unchanged = (
+                entry is not None and
+                entry['content_hash'] == PageCache.content_hash(html)
+            )
+
+        refreshed = entry['refreshed'] if unchanged else time.time()
+        with self.lock:
+            self.requests += 1
+            if unchanged:
+                self.unchanged_urls.add(url)
+            else:
+                self.unchanged_urls.discard(url)
+
+            with self.connection:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        url,
+                        response.headers.get('ETag', entry and entry['etag']),
+                        response.headers.get(
+                            'Last-Modified',
+                            entry and entry['last_modified']
+                        ),
+                        PageCache.content_hash(html),
+                        zlib.compress(html.encode('utf-8')),
+                        refreshed
+                    )
+                )
+        return html
+
+    def content_hash(html):
+        return hashlib.sha1(html.encode('utf-8')).hexdigest()
+
+    def is_unchanged(self, url):
+        with self.lock:
+            return url in self.unchanged_urls
+
+    def report(self):
+        print(
+            'Page cache: %i of %i pages unchanged.' %
+            (len(self.unchanged_urls), self.requests)
+        )
+
+    def close(self):
+        self.connection.close()
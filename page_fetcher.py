@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from real_estate.ordered_map import OrderedMap
+
+
+class HostLimiter(object):
+    """Cap the number of in-flight requests to each host."""
+
+    def __init__(self, max_requests_per_host):
+        self.max_requests_per_host = max_requests_per_host
+        self.condition = threading.Condition()
+        self.in_flight = {}
+        self.held = threading.local()
+
+    def host(url):
+        return urlparse(url).netloc
+
+    def limit(self, host):
+        return self.max_requests_per_host
+
+    def acquire(self, host):
+        with self.condition:
+            while self.in_flight.get(host, 0) >= self.limit(host):
+                self.condition.wait()
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.held_hosts().append(host)
+
+    def release(self, host):
+        self.held_hosts().remove(host)
+        with self.condition:
+            self.in_flight[host] -= 1
+            self.condition.notify_all()
+
+    def holds(self, host):
+        """Whether the calling thread holds a slot for `host`."""
+        return host in self.held_hosts()
+
+    def held_hosts(self):
+        if not hasattr(self.held, 'hosts'):
+            self.held.hosts = []
+        return self.held.hosts
+
+
+class ConcurrentPageFetcher(object):
+    """
+    Fetch pages on a thread pool, with at most `max_requests_per_host`
+    requests in flight to any one host.
+    """
+
+    def __init__(self, retrieve_page, max_workers, max_requests_per_host,
+                 host_limiter=None):
+        self.retrieve_page = retrieve_page
+        self.max_workers = max_workers
+        if host_limiter is None:
+            host_limiter = HostLimiter(max_requests_per_host)
+        self.host_limiter = host_limiter
+
+    def from_settings(retrieve_page, settings, host_limiter=None):
+        return ConcurrentPageFetcher(
+            retrieve_page,
+            settings.max_concurrent_requests,
+            settings.max_requests_per_host,
+            host_limiter
+        )
+
+    def fetch(self, url):
+        host = HostLimiter.host(url)
+        self.host_limiter.acquire(host)
+        try:
+            return self.retrieve_page(url)
+        finally:
+            self.host_limiter.release(host)
+
+    def map_in_order(self, fn, items):
+        """Map `fn` over `items` on the pool, yielding results in order."""
+        return OrderedMap.map(fn, items, self.max_workers)
+
+    def fetch_until(self, numbered_urls, stop_check):
+        """
+        Fetch `numbered_urls`, a list of (page_number, url) tuples, in
+        windows of `max_workers` pages, yielding (page_number, url, html) in
+        order. Pages are checked with `stop_check(html, page_number)`.
+        Nothing after the first stopping page is yielded and no new
+        requests are submitted, but the rest of its window is already in
+        flight, so up to `max_workers` more pages may be requested.
+        """
+        numbered_urls = list(numbered_urls)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start in range(0, len(numbered_urls), self.max_workers):
+                window = numbered_urls[start:start + self.max_workers]
+                futures = [
+                    executor.submit(self.fetch, url) for _, url in window
+                ]
+                for (page_num, url), future in zip(window, futures):
+                    html = future.result()
+                    if stop_check(html, page_num):
+                        for remaining in futures:
+                            remaining.cancel()
+                        return
+                    yield page_num, url, html
@@ -0,0 +1,138 @@
+from array import array
+import numpy as np
+import pandas as pd
+
+import real_estate.real_estate_property as rep
+
+
+class PropertyBatch(object):
+    """
+    Build the properties DataFrame column by column.
+
+    Property objects are appended by reading their attributes. `append`
+    takes a listing's values directly, so that a parser could skip the
+    Property tree, but the page scraper still creates Property objects.
+    Numeric columns are held in typed arrays and low cardinality string
+    columns as integer codes, and to_df produces the same DataFrame as
+    flattening Property.to_tuple.
+    """
+
+    COLUMN_NAMES = (
+        rep.SaleType.column_names() +
+        rep.Details.column_names() +
+        rep.AddressText.column_names() +
+        rep.StateAndPostcode.column_names()
+    )
+    NUMERIC_COLUMNS = (
+        'price_min', 'price_max', 'bedrooms', 'bathrooms', 'garage_spaces'
+    )
+    CODED_COLUMNS = ('sale_type', 'property_type', 'state')
+
+    def __init__(self):
+        self.length = 0
+        self.columns = {}
+        for name in self.COLUMN_NAMES:
+            if name in self.NUMERIC_COLUMNS:
+                self.columns[name] = array('d')
+            elif name in self.CODED_COLUMNS:
+                self.columns[name] = array('q')
+            else:
+                self.columns[name] = []
+
+        # Numeric columns become int64 unless they hold a None or a float,
+        # or object if they only hold None, matching the dtypes that
+        # pd.DataFrame.from_records infers.
+        self.all_ints = dict((name, True) for name in self.NUMERIC_COLUMNS)
+        self.all_none = dict((name, True) for name in self.NUMERIC_COLUMNS)
+        self.categories = dict((name, {}) for name in self.CODED_COLUMNS)
+
+    def from_properties(properties):
+        batch = PropertyBatch()
+        batch.extend(properties)
+        return batch
+
+    def __len__(self):
+        return self.length
+
+    def append(self, sale_type, under_contract, under_application,
+               price_min, price_max, property_type,
+               bedrooms, bathrooms, garage_spaces,
+               address_text, state, postcode):
+        values = (
+            sale_type, under_contract, under_application,
+            price_min, price_max, property_type,
+            bedrooms, bathrooms, garage_spaces,
+            address_text, state, postcode
+        )
+        for name, value in zip(self.COLUMN_NAMES, values):
+            if name in self.NUMERIC_COLUMNS:
+                self.append_number(name, value)
+            elif name in self.CODED_COLUMNS:
+                self.append_code(name, value)
+            else:
+                self.columns[name].append(value)
+        self.length += 1
+
+    def append_number(self, name, value):
+        if value is None:
+            self.all_ints[name] = False
+            value = np.nan
+        else:
+            self.all_none[name] = False
+            if not isinstance(value, (int, np.integer)):
+                self.all_ints[name] = False
+        self.columns[name].append(value)
+
+    def append_code(self, name, value):
+        codes = self.categories[name]
+        if value not in codes:
+            codes[value] = len(codes)
+        self.columns[name].append(codes[value])
+
+    def append_property(self, p):
+        sale_type = p.sale_type
+        details = p.details
+        price_min, price_max = sale_type.prices_tuple()
+        self.append(
+            sale_type.name, sale_type.under_contract,
+            sale_type.under_application, price_min, price_max,
+            details.property_type.name,
+            details.bedrooms, details.bathrooms, details.garage_spaces,
+            p.address_text.string,
+            p.state_and_postcode.state, p.state_and_postcode.postcode
+        )
+
+    def extend(self, properties):
+        for p in properties:
+            self.append_property(p)
+
+    def to_df(self, scrape_datetime, categoricals=False):
+        data = {}
+        for name in self.COLUMN_NAMES:
+            column = self.columns[name]
+            if name in self.NUMERIC_COLUMNS:
+                data[name] = self.numeric_column(name, column)
+            elif name in self.CODED_COLUMNS:
+                data[name] = self.coded_column(name, column, categoricals)
+            else:
+                data[name] = column
+
+        df = pd.DataFrame(data, columns=self.COLUMN_NAMES)
+        df['date_scraped'] = scrape_datetime
+        return df
+
+    def numeric_column(self, name, column):
+        if self.all_none[name]:
+            return np.full(len(column), None, dtype=object)
+        values = np.frombuffer(column, dtype=np.float64)
+        if self.all_ints[name]:
+            return values.astype(np.int64)
+        return values.copy()
+
+    def coded_column(self, name, column, categoricals):
+        categories = np.empty(len(self.categories[name]), dtype=object)
+        categories[:] = list(self.categories[name])
+        values = categories[np.frombuffer(column, dtype=np.int64)]
+        if categoricals:
+            return pd.Categorical(values)
+        return values
@@ -8,18 +8,78 @@ def to_str_if_none(x):
         return x
 
 
+SLOT_NAMES = {}
+
+
+def slot_names(cls):
+    names = SLOT_NAMES.get(cls)
+    if names is None:
+        names = tuple(
+            name for klass in reversed(cls.__mro__)
+            for name in getattr(klass, '__slots__', ())
+        )
+        SLOT_NAMES[cls] = names
+    return names
+
+
 class ObjectWithDictEquality(object):
+    __slots__ = ()
+
     def __eq__(self, other):
-        """Member wise equality."""
-        if type(other) is type(self):
-            return self.__dict__ == other.__dict__
-        return False
+        """Member wise equality, over both slots and the instance dict."""
+        if other is self:
+            return True
+        if type(other) is not type(self):
+            return False
+        for name in slot_names(type(self)):
+            if getattr(self, name, None) != getattr(other, name, None):
+                return False
+        return getattr(self, '__dict__', None) == \
+            getattr(other, '__dict__', None)
 
     def __ne__(self, other):
         """Not `return not self.__eq__(other)`."""
         return not self == other
 
 
+class InternedType(type):
+    """
+    Construct each class once, later calls return the same instance
+    without running __init__ again.
+    """
+
+    def __call__(cls):
+        instance = Interned.INSTANCES.get(cls)
+        if instance is None:
+            instance = super().__call__()
+            Interned.INSTANCES[cls] = instance
+        return instance
+
+
+class Interned(object, metaclass=InternedType):
+    """
+    Classes whose constructors take no arguments share a single immutable
+    instance, rather than creating a new one for every listing.
+    """
+    __slots__ = ()
+    INSTANCES = {}
+
+    def __setattr__(self, name, value):
+        if Interned.INSTANCES.get(type(self)) is self:
+            raise AttributeError(
+                '%s is interned and can not be changed.' % type(self).__name__)
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if Interned.INSTANCES.get(type(self)) is self:
+            raise AttributeError(
+                '%s is interned and can not be changed.' % type(self).__name__)
+        super().__delattr__(name)
+
+    def __reduce__(self):
+        return (type(self), ())
+
+
 class Property(ObjectWithDictEquality):
     def __init__(self, sale_type, details, address_text):
         self.sale_type = sale_type
@@ -94,7 +154,9 @@ class Property(ObjectWithDictEquality):
                 )
 
 
-class EmptyPropertyAttribute(ObjectWithDictEquality):
+class EmptyPropertyAttribute(Interned, ObjectWithDictEquality):
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -106,6 +168,8 @@ class EmptyPropertyAttribute(ObjectWithDictEquality):
 
 
 class NotYetPopulated(EmptyPropertyAttribute):
+    __slots__ = ()
+
     def not_yet_populated_error(self):
         raise RuntimeError('This field needs to be populated')
 
@@ -137,6 +201,8 @@ class DataContentTypeNotSupported(Property):
 
 
 class AddressText(ObjectWithDictEquality):
+    __slots__ = ('string',)
+
     def __init__(self, string):
         self.string = string
 
@@ -154,6 +220,11 @@ class AddressText(ObjectWithDictEquality):
 
 
 class Address(ObjectWithDictEquality):
+    __slots__ = (
+        'house', 'house_number', 'road', 'suburb', 'state', 'postcode',
+        'address_is_valid'
+    )
+
     def __init__(self,
                  house, house_number, road, suburb, state, postcode,
                  address_is_valid):
@@ -198,6 +269,8 @@ class Address(ObjectWithDictEquality):
 
 
 class AddressParseFailed(ObjectWithDictEquality):
+    __slots__ = ('string', 'components')
+
     def __init__(self, string, components):
         self.string = string
         self.components = components
@@ -212,6 +285,8 @@ class AddressParseFailed(ObjectWithDictEquality):
 
 
 class StateAndPostcode(ObjectWithDictEquality):
+    __slots__ = ('state', 'postcode')
+
     def __init__(self, state, postcode):
         self.state = state
         self.postcode = postcode
@@ -243,6 +318,11 @@ class StateAndPostcode(ObjectWithDictEquality):
 
 
 class Details(ObjectWithDictEquality):
+    __slots__ = (
+        'property_type', 'bedrooms', 'bathrooms', 'garage_spaces',
+        'land_area', 'floor_area'
+    )
+
     def __init__(self, property_type, bedrooms, bathrooms, garage_spaces,
                  land_area, floor_area):
         self.property_type = property_type
@@ -285,6 +365,8 @@ class Details(ObjectWithDictEquality):
 
 
 class SaleType(ObjectWithDictEquality):
+    __slots__ = ('name', 'prices', 'under_contract', 'under_application')
+
     def __init__(self, name, prices, under_contract, under_application):
         self.name = name
         self.prices = prices
@@ -332,36 +414,50 @@ class SaleType(ObjectWithDictEquality):
 
 
 class PrivateTreaty(SaleType):
+    __slots__ = ()
+
     def __init__(self, price, under_contract):
         super().__init__('Private Treaty', price, under_contract, None)
 
 
 class OffPlan(SaleType):
+    __slots__ = ()
+
     def __init__(self, price, under_contract):
         super().__init__('Off Plan', price, under_contract, None)
 
 
 class Auction(SaleType):
+    __slots__ = ()
+
     def __init__(self, under_contract):
         super().__init__('Auction', None, under_contract, None)
 
 
 class Tender(SaleType):
+    __slots__ = ()
+
     def __init__(self, under_contract):
         super().__init__('Tender', None, under_contract, None)
 
 
 class Negotiation(SaleType):
+    __slots__ = ()
+
     def __init__(self, under_contract):
         super().__init__('Negotiation', None, under_contract, None)
 
 
 class ContactAgent(SaleType):
+    __slots__ = ()
+
     def __init__(self, under_contract):
         super().__init__('Contact Agent', None, under_contract, None)
 
 
-class SaleTypeParseFailed(SaleType):
+class SaleTypeParseFailed(Interned, SaleType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Sale Type Parsing Failed', None, None, None)
 
@@ -372,7 +468,9 @@ class SaleTypeParseFailed(SaleType):
         return 'Sale Type parsing failed'
 
 
-class UnableToFindSaleTypeText(SaleType):
+class UnableToFindSaleTypeText(Interned, SaleType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             'Parsing Failed, unable to find sale type text',
@@ -387,22 +485,30 @@ class UnableToFindSaleTypeText(SaleType):
 
 
 class Rental(SaleType):
+    __slots__ = ()
+
     def __init__(self, price, under_application):
         super().__init__('Rental', price, None, under_application)
 
 
 class RentalNegotiation(SaleType):
+    __slots__ = ()
+
     def __init__(self, under_application):
         super().__init__('Rental by Negotiation', None, None,
                          under_application)
 
 
-class RentalUnderApplication(SaleType):
+class RentalUnderApplication(Interned, SaleType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Rental Under Application', None, None, True)
 
 
 class RentalTypeParseFailed(SaleType):
+    __slots__ = ('sale_text',)
+
     def __init__(self, sale_text):
         self.sale_text = sale_text
         super().__init__('Rental Type Parsing Failed', None, None, None)
@@ -415,6 +521,8 @@ class RentalTypeParseFailed(SaleType):
 
 
 class PropertyType(ObjectWithDictEquality):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -428,67 +536,93 @@ class PropertyType(ObjectWithDictEquality):
         return ('property_type',)
 
 
-class House(PropertyType):
+class House(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('House')
 
 
-class TownHouse(PropertyType):
+class TownHouse(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Town House')
 
 
-class Unit(PropertyType):
+class Unit(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Unit')
 
 
-class ServicedApartment(PropertyType):
+class ServicedApartment(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Serviced Apartment')
 
 
-class UnitBlock(PropertyType):
+class UnitBlock(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('UnitBlock')
 
 
-class Studio(PropertyType):
+class Studio(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Studio')
 
 
-class Land(PropertyType):
+class Land(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Land')
 
 
-class SemiRural(PropertyType):
+class SemiRural(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Semi Rural')
 
 
-class Duplex(PropertyType):
+class Duplex(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Duplex')
 
 
-class RetirementLiving(PropertyType):
+class RetirementLiving(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Retirement Living')
 
 
-class Rural(PropertyType):
+class Rural(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Rural')
 
 
-class NotSpecified(PropertyType):
+class NotSpecified(Interned, PropertyType):
+    __slots__ = ()
+
     def __init__(self, ):
         super().__init__('Not Specified')
 
 
 class PropertyTypeNotSupported(PropertyType):
+    __slots__ = ('property_type_text', 'soup_with_href')
+
     def __init__(self, property_type_text, soup_with_href):
         self.property_type_text = property_type_text
         self.soup_with_href = soup_with_href
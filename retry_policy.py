@@ -0,0 +1,246 @@
+import time
+import random
+import threading
+import email.utils
+from datetime import timezone
+import requests
+
+from real_estate.page_fetcher import HostLimiter
+
+
+class TokenBucket(object):
+    """Allow `rate` requests per second, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_refill) * self.rate
+                )
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter(object):
+    """A token bucket for each host."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def acquire(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            bucket = self.buckets[host]
+        bucket.acquire()
+
+
+class AIMDHostLimiter(HostLimiter):
+    """
+    A HostLimiter whose per host limit follows an additive-increase,
+    multiplicative-decrease rule. Each run of `increase_after` successful
+    requests raises the limit by one, up to `max_requests_per_host`, and
+    each throttled request halves it, down to one.
+    """
+
+    def __init__(self, max_requests_per_host, increase_after):
+        super().__init__(max_requests_per_host)
+        self.increase_after = increase_after
+        self.limits = {}
+        self.successes = {}
+
+    def limit(self, host):
+        return self.limits.get(host, self.max_requests_per_host)
+
+    def on_success(self, host):
+        with self.condition:
+            self.successes[host] = self.successes.get(host, 0) + 1
+            if self.successes[host] >= self.increase_after:
+                self.successes[host] = 0
+                self.limits[host] = min(
+                    self.limit(host) + 1, self.max_requests_per_host)
+                self.condition.notify_all()
+
+    def on_throttle(self, host):
+        with self.condition:
+            self.successes[host] = 0
+            self.limits[host] = max(self.limit(host) // 2, 1)
+
+
+class RetryPolicy(object):
+    """
+    Retry requests with exponential backoff and jitter.
+
+    Only timeouts, connection errors, and the HTTP statuses in
+    RETRYABLE_STATUSES are retried, unless `retry_any_error` is set. A
+    Retry-After header sets the minimum delay before the next attempt.
+    Requests can optionally be rate limited per host, and can report
+    successes and throttling to an AIMDHostLimiter so that it can adjust
+    the number of requests in flight. A slot the calling thread holds in
+    the host limiter is given up while it waits to retry.
+    """
+
+    RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+    THROTTLING_STATUSES = {429, 503}
+    MAX_RETRY_AFTER = 300
+
+    def __init__(self, max_attempts, base_delay, max_delay,
+                 rate_limiter=None, host_limiter=None, verbose=True,
+                 retry_any_error=False):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limiter = rate_limiter
+        self.host_limiter = host_limiter
+        self.verbose = verbose
+        self.retry_any_error = retry_any_error
+
+    def from_settings(settings, max_attempts):
+        rate_limiter = None
+        if settings.max_requests_per_second_per_host is not None:
+            rate_limiter = HostRateLimiter(
+                settings.max_requests_per_second_per_host,
+                settings.max_requests_per_host
+            )
+
+        return RetryPolicy(
+            max_attempts,
+            settings.retry_base_delay,
+            settings.retry_max_delay,
+            rate_limiter,
+            AIMDHostLimiter(
+                settings.max_requests_per_host,
+                settings.aimd_increase_after
+            )
+        )
+
+    def from_backoff(current_delay, max_delay):
+        """
+        The policy equivalent to doubling `current_delay` until it exceeds
+        `max_delay`, retrying any request error.
+        """
+        max_attempts = 1
+        delay = current_delay
+        while delay <= max_delay:
+            max_attempts += 1
+            delay *= 2
+        return RetryPolicy(
+            max_attempts, current_delay, max_delay, verbose=False,
+            retry_any_error=True
+        )
+
+    def get(self, session, url, err_str=None, **kwargs):
+        return self.request(session, 'GET', url, err_str, **kwargs)
+
+    def request(self, session, method, url, err_str=None, **kwargs):
+        send = getattr(session, method.lower())
+        host = HostLimiter.host(url)
+        error = None
+        for attempt in range(self.max_attempts):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(host)
+
+            response = None
+            try:
+                response = send(url, **kwargs)
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                if not self.is_retryable(response.status_code):
+                    raise
+                error = e
+                if response.status_code in self.THROTTLING_STATUSES:
+                    self.report_throttle(host)
+            except requests.exceptions.Timeout as e:
+                error = e
+                self.report_throttle(host)
+            except requests.exceptions.ConnectionError as e:
+                error = e
+            except requests.exceptions.RequestException as e:
+                if not self.retry_any_error:
+                    raise
+                error = e
+            else:
+                self.report_success(host)
+                return response
+
+            if attempt + 1 < self.max_attempts:
+                if self.verbose:
+                    print('%s, trying to get page again, attempt %i.'
+                          % (str(error), attempt + 1))
+                self.sleep(host, self.delay(attempt, response))
+
+        if err_str is not None:
+            print('Max retries exceeded. Printing error comment:')
+            print(err_str)
+        raise error
+
+    def is_retryable(self, status_code):
+        return self.retry_any_error or status_code in self.RETRYABLE_STATUSES
+
+    def sleep(self, host, seconds):
+        limiter = self.host_limiter
+        if limiter is None or not limiter.holds(host):
+            time.sleep(seconds)
+            return
+
+        limiter.release(host)
+        try:
+            time.sleep(seconds)
+        finally:
+            limiter.acquire(host)
+
+    def delay(self, attempt, response=None):
+        # "Equal jitter", half of the exponential delay is randomised.
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay = delay / 2 + random.uniform(0, delay / 2)
+
+        retry_after = RetryPolicy.retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.MAX_RETRY_AFTER))
+        return delay
+
+    def retry_after(response):
+        if response is None:
+            return None
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            # HTTP dates are in GMT, but "-0000" parses as a naive datetime.
+            date = date.replace(tzinfo=timezone.utc)
+        return max(date.timestamp() - time.time(), 0)
+
+    def report_success(self, host):
+        if self.host_limiter is not None:
+            self.host_limiter.on_success(host)
+
+    def report_throttle(self, host):
+        if self.host_limiter is not None:
+            self.host_limiter.on_throttle(host)
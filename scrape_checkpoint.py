@@ -0,0 +1,113 @@
+import os
+import json
+import threading
+
+from real_estate.html_dump import HTMLDump
+
+
+class ScrapeCheckpoint(object):
+    """
+    A manifest of the (postcode, state, page number) tuples already stored
+    in an HTML dump, and of the postcodes that have been completely scraped.
+
+    The manifest is an append-only JSON lines file that sits next to the
+    dump. Entries are only written once the page they describe has been
+    flushed to the dump, so a restarted run can skip everything it lists.
+    Scrapes that are not split by postcode use (None, None) as the key.
+    """
+
+    MANIFEST_SUFFIX = '.manifest'
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.lock = threading.Lock()
+        self.stored = {}
+        self.complete = set()
+
+        if os.path.isfile(self.manifest_path):
+            for record in ScrapeCheckpoint.read_manifest(self.manifest_path):
+                self.add(record)
+
+    def open(dump_path, resume):
+        """
+        Open the checkpoint for `dump_path`. Unless `resume` is set, any
+        existing dump and manifest are removed so the run starts afresh.
+        """
+        manifest_path = dump_path + ScrapeCheckpoint.MANIFEST_SUFFIX
+
+        if not resume:
+            for file_path in (dump_path, manifest_path):
+                if os.path.isfile(file_path):
+                    os.remove(file_path)
+        elif os.path.isfile(dump_path) and HTMLDump.repair(dump_path):
+            print('Repaired the damaged end of the HTML dump: %s' % dump_path)
+            ScrapeCheckpoint.rebuild_manifest(dump_path, manifest_path)
+
+        checkpoint = ScrapeCheckpoint(manifest_path)
+        if resume:
+            print(
+                'Resuming from checkpoint, %i pages already stored and '
+                '%i postcodes complete.'
+                % (checkpoint.number_of_stored_pages(), len(checkpoint.complete))
+            )
+        return checkpoint
+
+    def rebuild_manifest(dump_path, manifest_path):
+        # Complete markers are only written after all of a postcode's pages
+        # were flushed, so they survive a repair of the dump.
+        completes = []
+        if os.path.isfile(manifest_path):
+            completes = [
+                x for x in ScrapeCheckpoint.read_manifest(manifest_path)
+                if x.get('complete')
+            ]
+
+        with open(manifest_path, 'w') as f:
+            for page in HTMLDump.read_pages(dump_path):
+                f.write(json.dumps(ScrapeCheckpoint.page_record(page)) + '\n')
+            for record in completes:
+                f.write(json.dumps(record) + '\n')
+
+    def read_manifest(manifest_path):
+        with open(manifest_path, 'r') as f:
+            for line in f:
+                if line.endswith('\n'):
+                    yield json.loads(line)
+
+    def page_record(page):
+        return {
+            'postcode': page['postcode'],
+            'state': page['state'],
+            'page_number': page['page_number'],
+        }
+
+    def add(self, record):
+        key = (record['postcode'], record['state'])
+        if record.get('complete'):
+            self.complete.add(key)
+        else:
+            self.stored.setdefault(key, set()).add(record['page_number'])
+
+    def append(self, record):
+        with self.lock:
+            with open(self.manifest_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+            self.add(record)
+
+    def record_page(self, page):
+        self.append(ScrapeCheckpoint.page_record(page))
+
+    def record_complete(self, pc, state):
+        self.append({'postcode': pc, 'state': state, 'complete': True})
+
+    def is_complete(self, pc, state):
+        return (pc, state) in self.complete
+
+    def stored_pages(self, pc, state):
+        return self.stored.get((pc, state), set())
+
+    def number_of_stored_pages(self):
+        return sum(len(x) for x in self.stored.values())
+
+    def is_empty(self):
+        return len(self.stored) == 0 and len(self.complete) == 0
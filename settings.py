@@ -22,6 +22,15 @@ class GeoSettings(Settings):
 
 
 class BasicSettings(Settings):
+    MAX_CONCURRENT_REQUESTS = 8
+    MAX_REQUESTS_PER_HOST = 4
+    HTTP_POOL_CONNECTIONS = 10
+    HTTP_POOL_MAXSIZE = 10
+    HTTP_TIMEOUT = 1
+    RETRY_BASE_DELAY = 0.5
+    RETRY_MAX_DELAY = 60
+    AIMD_INCREASE_AFTER = 20
+
     def __init__(self, run_category, settings_file_path, run_dir, verbose):
         super().__init__(os.path.join(run_dir, settings_file_path))
         self.run_dir = run_dir
@@ -45,6 +54,53 @@ class BasicSettings(Settings):
         )
         self.streetscope_location = self.json['streetscope_location']
 
+        scraper_settings = self.json.get('scraper_settings', {})
+        self.max_concurrent_requests = scraper_settings.get(
+            'max_concurrent_requests', self.MAX_CONCURRENT_REQUESTS)
+        self.max_requests_per_host = scraper_settings.get(
+            'max_requests_per_host', self.MAX_REQUESTS_PER_HOST)
+        self.max_requests_per_second_per_host = scraper_settings.get(
+            'max_requests_per_second_per_host')
+        self.retry_base_delay = scraper_settings.get(
+            'retry_base_delay', self.RETRY_BASE_DELAY)
+        self.retry_max_delay = scraper_settings.get(
+            'retry_max_delay', self.RETRY_MAX_DELAY)
+        self.aimd_increase_after = scraper_settings.get(
+            'aimd_increase_after', self.AIMD_INCREASE_AFTER)
+        self.page_cache_file = scraper_settings.get('page_cache_file')
+        if self.page_cache_file is not None:
+            self.page_cache_file = os.path.join(
+                self.data_dir, self.page_cache_file)
+
+        http_settings = self.json.get('http_settings', {})
+        self.http_pool_connections = http_settings.get(
+            'pool_connections', self.HTTP_POOL_CONNECTIONS)
+        self.http_pool_maxsize = http_settings.get(
+            'pool_maxsize', self.HTTP_POOL_MAXSIZE)
+        self.http_timeout = http_settings.get('timeout', self.HTTP_TIMEOUT)
+
+        geocoder_settings = self.json.get('geocoder_settings', {})
+        self.geocoder_max_in_flight = geocoder_settings.get('max_in_flight')
+        self.geocoder_bulk_size = geocoder_settings.get('bulk_size')
+        self.geocoder_timeout = geocoder_settings.get('timeout')
+        self.geocode_cache_file = geocoder_settings.get('cache_file')
+        if self.geocode_cache_file is not None:
+            self.geocode_cache_file = os.path.join(
+                self.data_dir, self.geocode_cache_file)
+
+        # Each address parser process loads libpostal, so only one is
+        # started unless more are asked for.
+        address_parser_settings = self.json.get('address_parser_settings', {})
+        self.address_parser_processes = address_parser_settings.get(
+            'processes')
+
+        model_settings = self.json.get('model_settings', {})
+        self.unduplicator_state_file = model_settings.get(
+            'unduplicator_state_file')
+        if self.unduplicator_state_file is not None:
+            self.unduplicator_state_file = os.path.join(
+                self.data_dir, self.unduplicator_state_file)
+
 
 class AssistantSettings(BasicSettings):
     def __init__(self, state, run_category, settings_file_path,
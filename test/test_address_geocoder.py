@@ -1,8 +1,24 @@
 import unittest
+import os
+import json
+import sys
+import time
+import socket
+import shutil
+import tempfile
+import threading
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import re
 import numpy as np
 import pandas as pd
 from real_estate.address_geocoder import (
-    StreetscopeGeocoder, ElasticsearchServer, StreetscopeServer)
+    StreetscopeGeocoder, ElasticsearchServer, StreetscopeServer,
+    SimpleSubprocess)
+from real_estate.geocode_cache import GeocodeCache
+from real_estate.data_processing.data_storer import DataStorer
+from real_estate.http_session import PooledSession
 
 
 class ServerTests():
@@ -19,6 +35,47 @@ class ServerTests():
         test_class.assertFalse(server.ping())
 
 
+class HTTPServerSubprocess(SimpleSubprocess):
+    def __init__(self, port):
+        self.start_command = (
+            sys.executable, '-m', 'http.server', str(port),
+            '--bind', 'localhost'
+        )
+        self.ping_url = 'http://localhost:%i/' % port
+        self.start_up_timeout = 10
+        self.shut_down_timeout = 5
+
+
+class TestSimpleSubprocess(unittest.TestCase):
+    def free_port(self):
+        with socket.socket() as s:
+            s.bind(('localhost', 0))
+            return s.getsockname()[1]
+
+    def test_start_and_stop(self):
+        port = self.free_port()
+        server = HTTPServerSubprocess(port)
+        server.start()
+        self.assertTrue(server.ping())
+
+        other = HTTPServerSubprocess(port)
+        other.start()
+        self.assertIsNone(other.proc)
+        other.stop()
+        self.assertTrue(server.ping())
+
+        server.stop()
+        self.assertFalse(server.ping())
+
+    def test_start_up_timeout(self):
+        server = HTTPServerSubprocess(self.free_port())
+        server.start_command = (
+            sys.executable, '-c', 'import time; time.sleep(60)')
+        server.start_up_timeout = 0.5
+        self.assertRaises(RuntimeError, server.start)
+        self.assertIsNone(server.proc)
+
+
 class TestElasticsearchServer(unittest.TestCase):
     def test_start_server(self):
         ServerTests.start_server_test(self, ElasticsearchServer)
@@ -93,10 +150,9 @@ class TestStreetscopeGeocoder(unittest.TestCase):
     ]
 
 
-    def test_mk_url(self):
+    def test_mk_urls(self):
         data = self.geocoder.clean_strings(self.TEST_DF.copy())
-        for i, r in enumerate(data.iterrows()):
-            self.assertEqual(self.geocoder.mk_url(r[1].values), self.URLS[i])
+        self.assertEqual(self.geocoder.mk_urls(data), self.URLS)
 
     def test_geocoding(self):
         coords = self.geocoder.geocode_addresses(self.TEST_DF[:-1].copy())
@@ -110,3 +166,271 @@ class TestStreetscopeGeocoder(unittest.TestCase):
         self.assertTrue(np.isnan(r['latitude']))
         self.assertTrue(np.isnan(r['longitude']))
         self.assertEqual(r['geocoding_is_valid'], self.EXPECTED_RESULTS[-1][2])
+
+
+class CountingGeocoder(StreetscopeGeocoder):
+    def __init__(self, cache):
+        super().__init__(False, None, cache=cache, max_in_flight=1)
+        self.servers_running = True
+        self.geocoded = []
+
+    def geocode(self, url, r):
+        self.geocoded.append(r['house_number'])
+        return [float(r['postcode']), 0.0, r['house_number'] != '2']
+
+
+class TestGeocodeCaching(unittest.TestCase):
+    DF = pd.DataFrame(
+        columns=['house', 'house_number', 'road', 'suburb', 'state', 'postcode'],
+        data=[
+            [None, '1', 'a street', 'b', 'act', 2600],
+            [None, '2', 'a street', 'b', 'act', 2600],
+            [None, '1', 'a street', 'b', 'act', 2600],
+            [None, '"1"', 'a street', 'b', 'act', 2601],
+        ],
+        index=[10, 11, 12, 13]
+    )
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.temp_dir, 'geocodes.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def geocode(self):
+        geocoder = CountingGeocoder(GeocodeCache(self.cache_file))
+        data = geocoder.geocode_addresses(self.DF.copy())
+        geocoder.cache.close()
+        return geocoder, data
+
+    def test_geocode_each_address_once(self):
+        geocoder, data = self.geocode()
+        self.assertEqual(geocoder.geocoded, ['1', '2', '1'])
+        self.assertEqual(list(data.index), [10, 11, 12, 13])
+        self.assertEqual(
+            list(data['latitude']), [2600.0, 2600.0, 2600.0, 2601.0])
+        self.assertEqual(
+            list(data['geocoding_is_valid']), [True, False, True, True])
+
+        geocoder, cached_data = self.geocode()
+        self.assertEqual(geocoder.geocoded, [])
+        self.assertTrue(cached_data.equals(data))
+
+    def test_schema_applied_data(self):
+        df = self.DF.copy()
+        df.loc[13, 'road'] = "'a street'"
+        geocoder = CountingGeocoder(None)
+        expected = geocoder.geocode_addresses(df.copy())
+
+        geocoder = CountingGeocoder(None)
+        data = geocoder.geocode_addresses(DataStorer.apply_schema(df))
+        self.assertEqual(geocoder.geocoded, ['1', '2', '1'])
+        self.assertEqual(list(data['road'].cat.categories), ['a street'])
+        for a in ['latitude', 'longitude', 'geocoding_is_valid']:
+            self.assertTrue(data[a].equals(expected[a]), a)
+
+    def test_from_settings(self):
+        settings = SimpleNamespace(
+            streetscope_location=None, geocode_cache_file=self.cache_file,
+            http_pool_connections=1, http_pool_maxsize=10, http_timeout=1,
+            geocoder_max_in_flight=4, geocoder_bulk_size=100,
+            geocoder_timeout=30
+        )
+        geocoder = StreetscopeGeocoder.from_settings(settings, False)
+        self.assertEqual(geocoder.session.timeout, 30)
+        self.assertEqual(geocoder.max_in_flight, 4)
+        self.assertEqual(geocoder.bulk_size, 100)
+        self.assertIsInstance(geocoder.cache, GeocodeCache)
+        geocoder.cache.close()
+        self.assertTrue(os.path.isfile(self.cache_file))
+
+        settings.geocode_cache_file = None
+        settings.geocoder_max_in_flight = None
+        geocoder = StreetscopeGeocoder.from_settings(settings, False)
+        self.assertIsNone(geocoder.cache)
+        self.assertEqual(
+            geocoder.max_in_flight, StreetscopeGeocoder.MAX_IN_FLIGHT)
+
+    def test_no_default_timeout(self):
+        # The scraper's short page timeout would cut off bulk searches.
+        geocoder = StreetscopeGeocoder(False, None)
+        self.assertIsNone(geocoder.session.timeout)
+        self.assertIsNot(geocoder.session, PooledSession.shared())
+
+
+def stub_search_hits(query):
+    number, road, suburb, state_and_postcode = re.match(
+        r'(\S+) (.+), (.+), (.+)', query).groups()
+    state, postcode = state_and_postcode.split(' ')
+    return {'total': 1, 'hits': [{'_source': {
+        'NUMBER': number, 'STREET': road, 'CITY': suburb,
+        'REGION': state, 'POSTCODE': postcode, 'ADDRESS': query,
+        'Y': -35 - int(number) / 1000, 'X': 149.0,
+    }}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers Streetscope geocode queries and Elasticsearch multi searches
+    with one hit per query, after a delay like a real search.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    DELAY = 0.02
+
+    LOCK = threading.Lock()
+    IN_FLIGHT = 0
+    PEAK_IN_FLIGHT = 0
+    MSEARCH_SIZES = []
+
+    def reset():
+        with StubHandler.LOCK:
+            StubHandler.IN_FLIGHT = 0
+            StubHandler.PEAK_IN_FLIGHT = 0
+            StubHandler.MSEARCH_SIZES = []
+
+    def do_GET(self):
+        self.begin()
+        time.sleep(self.DELAY)
+        query = parse_qs(urlparse(self.path).query)['query'][0]
+        data = stub_search_hits(query)
+        self.end()
+        self.send_json(data)
+
+    def do_POST(self):
+        self.begin()
+        time.sleep(self.DELAY)
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        searches = [json.loads(x) for x in body.decode().splitlines()][1::2]
+        with StubHandler.LOCK:
+            StubHandler.MSEARCH_SIZES.append(len(searches))
+        data = {'responses': [
+            {'hits': stub_search_hits(
+                search['query']['match']['ADDRESS']['query'])}
+            for search in searches
+        ]}
+        self.end()
+        self.send_json(data)
+
+    def begin(self):
+        with StubHandler.LOCK:
+            StubHandler.IN_FLIGHT += 1
+            StubHandler.PEAK_IN_FLIGHT = max(
+                StubHandler.PEAK_IN_FLIGHT, StubHandler.IN_FLIGHT)
+
+    def end(self):
+        # Before the response is sent, so that the next request can't
+        # overlap with this one.
+        with StubHandler.LOCK:
+            StubHandler.IN_FLIGHT -= 1
+
+    def send_json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestConcurrentGeocoding(unittest.TestCase):
+    DF = pd.DataFrame(
+        columns=['house', 'house_number', 'road', 'suburb', 'state', 'postcode'],
+        data=[
+            [None, str(i), 'a street', 'b', 'act', 2600] for i in range(1, 41)
+        ]
+    )
+
+    @classmethod
+    def setUpClass(self):
+        self.server = ThreadingHTTPServer(
+            ('localhost', 0), StubHandler)
+        self.server.daemon_threads = True
+        self.url = 'http://localhost:%i/' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @classmethod
+    def tearDownClass(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def geocode(self, max_in_flight, bulk_size=None):
+        geocoder = StreetscopeGeocoder(
+            False, None, session=PooledSession(1, 10, None),
+            max_in_flight=max_in_flight,
+            geocode_url=self.url + 'geocode?query=', bulk_size=bulk_size,
+            msearch_url=self.url + 'addresses/_msearch'
+        )
+        geocoder.servers_running = True
+        StubHandler.reset()
+        data = geocoder.geocode_addresses(self.DF.copy())
+        geocoder.session.close()
+        return data, StubHandler.PEAK_IN_FLIGHT
+
+    def test_concurrent_geocoding(self):
+        sequential, sequential_peak = self.geocode(1)
+        concurrent, concurrent_peak = self.geocode(8)
+
+        self.assertTrue(concurrent.equals(sequential))
+        self.assertEqual(
+            list(concurrent['latitude']),
+            [-35 - i / 1000 for i in range(1, 41)]
+        )
+        self.assertTrue(concurrent['geocoding_is_valid'].all())
+        self.assertEqual(sequential_peak, 1)
+        self.assertGreater(concurrent_peak, 1)
+        self.assertLessEqual(concurrent_peak, 8)
+
+    def test_bulk_geocoding(self):
+        sequential, _ = self.geocode(1)
+        self.assertEqual(StubHandler.MSEARCH_SIZES, [])
+
+        bulk, _ = self.geocode(1, bulk_size=15)
+        self.assertTrue(bulk.equals(sequential))
+        self.assertEqual(StubHandler.MSEARCH_SIZES, [15, 15, 10])
+
+        concurrent_bulk, _ = self.geocode(2, bulk_size=15)
+        self.assertTrue(concurrent_bulk.equals(sequential))
+        self.assertEqual(sorted(StubHandler.MSEARCH_SIZES), [10, 15, 15])
+
+
+class TestQueryBuilding(unittest.TestCase):
+    def test_mk_urls(self):
+        geocoder = StreetscopeGeocoder(False, None)
+        data = geocoder.clean_strings(TestStreetscopeGeocoder.TEST_DF.copy())
+        self.assertEqual(geocoder.mk_urls(data), TestStreetscopeGeocoder.URLS)
+
+    def clean_string(self, x):
+        """The row by row cleaning that clean_strings replaced."""
+        if isinstance(x, str):
+            x = re.sub(r'"|\'|\*|%22|\^', '', x)
+            return x.strip()
+        else:
+            return x
+
+    def test_clean_strings(self):
+        geocoder = StreetscopeGeocoder(False, None)
+        data = pd.DataFrame({
+            'house': [None, '"a"', np.NaN],
+            'house_number': ['24%22', ' *1^ ', 3],
+            'road': ["b's road", None, ''],
+            'suburb': [np.NaN, np.NaN, np.NaN],
+        })
+        cleaned = geocoder.clean_strings(data.copy())
+        for a in data.columns:
+            expected = data[a].map(self.clean_string)
+            self.assertTrue(cleaned[a].equals(expected), a)
+
+        categorical = geocoder.clean_strings(data.astype('category'))
+        for a in data.columns:
+            expected = data[a].map(self.clean_string)
+            self.assertTrue(
+                categorical[a].astype(object).equals(expected.astype(object)),
+                a
+            )
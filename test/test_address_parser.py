@@ -1,5 +1,11 @@
+import os
+import re
+import time
+import shutil
+import tempfile
 import unittest
 from real_estate.address_parser import RealEstateAddressParser
+from real_estate.address_parser import AddressComponentValidator
 from real_estate.real_estate_property import AddressParseFailed
 from real_estate.json_load_and_dump import JSONLoadAndDump
 
@@ -7,6 +13,75 @@ from real_estate.json_load_and_dump import JSONLoadAndDump
 class TestAddressParser(unittest.TestCase):
     TEST_ADDRESSES = 'real_estate/test/test_data/test_addresses.json'
 
+    # The preprocessing rules as they were before they were compiled into
+    # a pipeline, with the (?i) flags moved to the front as Python now
+    # requires.
+    ORIGINAL_PREPROCESSING_REGEX_SUBSTITUTIONS = [
+        (r'  ', r' '),
+
+        # libpostal doesn't like '&' between street names.
+        (r'([a-zA-Z]+)(?: \& )([a-zA-Z]+)', r'\1 and \2'),
+
+        # Ending with a partial postcode and '...'.
+        (r'(.*)(?:\d{2}\.{3})$', r'\1'),
+
+        # Ending with '...'.
+        (r'(.*)(?:\.{3})$', r'\1'),
+
+        # Special case. Remove '. '.
+        (r'^(\. )', r''),
+
+        # Remove "'" and '/' from property names.
+        (r'\'([a-zA-Z ]+)\'/', r'\1 '),
+        (r'\'([a-zA-Z ]+)\'', r'\1'),
+
+        # Special case. Fix a typo
+        (r'^(\d+) (-\d+)', r'\1\2'),
+
+        # Special case. Fix typos
+        (r'(?i)([a-zA-Z ]+)/blocks ([0-9]+)- section ([0-9]+), ',
+         r'\1 block __\2__ section __\3__, __no_street__ street, '),
+
+        # Address doesn't have a street which confuses libpostal, so we
+        # insert a fake street that will be removed after parsing.
+        (r'(?i)block ([a-zA-Z0-9]+) section ([a-zA-Z0-9]+)( [a-zA-Z]+)?, ',
+         r'block __\1__ section __\2__\3, __no_street__ street, '),
+
+        # Special case. Insert a fake street to help libpostal.
+        (r'(?i)^(?:\* |\*/\* )\(no street name\), ',
+         r'__no_street__ street, '),
+
+        # Special case.
+        (r'(?i)^(.*), address available on request$',
+         r'__address_available_on_request__ street, \1'),
+
+        # libpostal doesn't understand the 'unit' prefix.
+        (r'(?i)^units? (\d+), ', r'\1/'),
+
+        # Special case, Taggerty Steet without a street name.
+        (r'(?i)(\d+ taggerty), (ngunnawal)', r'\1 Street, \2'),
+        (r'(?i)(\d+ yerradhang), (ngunnawal)', r'\1 Street, \2'),
+        (r'(?i)(\d+ bunda), (city)', r'\1 Street, \2'),
+        (r'(?i)(\d+ chaseling), (phillip)', r'\1 Street, \2'),
+        (r'(?i)(\d+ constitution), (reid)', r'\1 Avenue, \2'),
+
+        # Special case, Totterdell is a loop and a street in Belconnen.
+        (r'(?i)(1-9 totterdell), (belconnen)', r'\1 Street, \2'),
+
+        # Special cases.
+        (
+            r'(?i)^(\d+/\d+) manhattan on the park ([a-zA-Z]+)',
+            r'__manhattan_on_the_park__ \1 \2'
+        ),
+        (r'(?i)^(nibu) - (\d+)', r'__\1__ \2'),
+        (r'(?i)^(\d+ [a-zA-Z ]+) (form), ', r'__\2__ \1, '),
+        (r'(?i)^(\d+ [a-zA-Z ]+) (hudson) (square), ', r'__\2_\3__ \1, '),
+        (r'(?i)^(\d+) (mosaic),(\d+)', r'__\2__ \1/\3'),
+
+        # Special 'Malmo' case.
+        (r'(?i)^(malmo) (\d+)', r'__\1__, \2'),
+    ]
+
     def open_test_data(self):
         return JSONLoadAndDump.load_from_file(self.TEST_ADDRESSES)
 
@@ -31,3 +106,131 @@ class TestAddressParser(unittest.TestCase):
         for test in tests:
             parsed = parser.parse_and_validate_address(test)
             self.assertIs(type(parsed), AddressParseFailed)
+
+    def sequential_preprocess_string(self, address_string, parser=None):
+        for pattern, replacement in (
+            self.ORIGINAL_PREPROCESSING_REGEX_SUBSTITUTIONS
+        ):
+            address_string = re.sub(pattern, replacement, address_string)
+
+        if parser is None:
+            parser = RealEstateAddressParser()
+        for x in RealEstateAddressParser.STREET_NAMES_REQUIRING_FIXES:
+            address_string = re.sub(
+                r'(?i)%s, ' % x,
+                parser.street_fix_format(x) + ', ',
+                address_string
+            )
+        return address_string
+
+    def preprocessing_test_strings(self):
+        test_cases = self.open_test_data()
+        strings = (
+            test_cases['valid_address_strings'] +
+            test_cases['invalid_address_strings']
+        )
+        return strings + [s.upper() for s in strings] + [
+            s.lower() for s in strings]
+
+    def test_preprocess_string(self):
+        parser = RealEstateAddressParser()
+        for test in self.preprocessing_test_strings():
+            self.assertEqual(
+                parser.preprocess_string(test),
+                self.sequential_preprocess_string(test),
+                '\nTest Str: %s' % test
+            )
+
+    def test_preprocessing_benchmark(self):
+        parser = RealEstateAddressParser()
+        strings = self.preprocessing_test_strings()
+        repeats = 10
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            expected = [
+                self.sequential_preprocess_string(s, parser) for s in strings]
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            results = [parser.preprocess_string(s) for s in strings]
+        pipeline_time = time.perf_counter() - start
+
+        print(
+            '\nPreprocessed %i strings %i times: sequential %.3fs, '
+            'pipeline %.3fs.'
+            % (len(strings), repeats, sequential_time, pipeline_time)
+        )
+        self.assertEqual(results, expected)
+        self.assertLess(pipeline_time, sequential_time)
+
+    def test_postprocess_components(self):
+        components = [
+            ('__no_street__ street', 'road'),
+            ('block __a__ section __12__', 'house'),
+            ('__nibu__', 'house'),
+            ('__rolph_place__ street', 'road'),
+            ('__act__', 'city'),
+            ('2600', 'postcode'),
+            ('__no_street__ street', 'road'),
+        ]
+        parser = RealEstateAddressParser()
+        self.assertEqual(
+            parser.postprocess_components(components),
+            [
+                ('block a section 12', 'house'),
+                ('nibu', 'house'),
+                ('rolph place', 'road'),
+                ('act', 'state'),
+                ('2600', 'postcode'),
+            ]
+        )
+
+    def test_postprocessing_file(self):
+        temp_dir = tempfile.mkdtemp()
+        file_path = os.path.join(temp_dir, 'postprocessing.json')
+        JSONLoadAndDump.dump_to_file({'substitutions': [
+            [['__new_case__', 'house'], ['new case', 'house']],
+            [['__act__', 'city'], ['act', 'city']],
+        ]}, file_path)
+        parser = RealEstateAddressParser(file_path)
+        shutil.rmtree(temp_dir)
+
+        self.assertEqual(
+            parser.postprocess_components(
+                [('__new_case__', 'house'), ('__act__', 'city')]),
+            [('new case', 'house'), ('act', 'city')]
+        )
+
+
+class TestAddressComponentValidator(unittest.TestCase):
+    VALID = [
+        ('1', 'house_number'), ('a street', 'road'), ('b', 'suburb'),
+        ('act', 'state'), ('2600', 'postcode')
+    ]
+
+    def test_validate_batch(self):
+        components_list = [
+            self.VALID,
+            [],
+            self.VALID + [('c', 'city')],
+            self.VALID + [('2', 'house_number')],
+            self.VALID[:-1],
+            [('address available on request', 'special'), ('b', 'city')],
+            self.VALID[:-1] + [('__2600', 'postcode')],
+            self.VALID[:-1] + [('2600__', 'postcode')],
+        ]
+        validator = AddressComponentValidator()
+        valid = validator.validate_batch(components_list)
+
+        self.assertEqual(
+            list(valid), [True, False, False, False, False, True, False, True])
+        self.assertEqual(list(valid), [
+            validator.validate_address_components(None, c)
+            for c in components_list
+        ])
+
+    def test_validate_empty_batch(self):
+        self.assertEqual(
+            len(AddressComponentValidator().validate_batch([])), 0)
@@ -0,0 +1,85 @@
+import unittest
+import os
+import shutil
+import json
+import tempfile
+import real_estate.real_estate_property as rep
+from real_estate.address_parser import RealEstateAddressParser
+from real_estate.batch_address_parser import BatchAddressParser
+
+
+class FakeBatchAddressParser(BatchAddressParser):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def parse_unseen(self, strings):
+        self.batches.append(strings)
+        return [
+            [(s, 'road')] if s != 'bad' else rep.AddressParseFailed(s, [])
+            for s in strings
+        ]
+
+
+class TestBatchAddressParser(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.memo_file = os.path.join(self.temp_dir, 'memo.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_parse(self):
+        parser = FakeBatchAddressParser(self.memo_file)
+        components = parser.parse(['a', 'b', 'a', float('nan'), 'bad'])
+        parser.close()
+
+        self.assertEqual(parser.batches, [['a', 'b', 'bad']])
+        self.assertEqual(components[0], [('a', 'road')])
+        self.assertEqual(components[1], [('b', 'road')])
+        self.assertEqual(components[2], [('a', 'road')])
+        self.assertEqual(type(components[3]), rep.AddressParseFailed)
+        self.assertEqual(components[4], rep.AddressParseFailed('bad', []))
+
+    def test_memo_persists(self):
+        parser = FakeBatchAddressParser(self.memo_file)
+        first = parser.parse(['a', 'bad'])
+        parser.close()
+
+        parser = FakeBatchAddressParser(self.memo_file)
+        second = parser.parse(['c', 'bad', 'a'])
+        parser.close()
+
+        self.assertEqual(parser.batches, [['c']])
+        self.assertEqual(parser.memo_hits, 2)
+        self.assertEqual(second, [[('c', 'road')], first[1], first[0]])
+
+    def write_postprocessing_file(self, substitutions):
+        file_path = os.path.join(self.temp_dir, 'postprocessing.json')
+        with open(file_path, 'w') as f:
+            json.dump({'substitutions': substitutions}, f)
+        # The parser must be able to read it.
+        RealEstateAddressParser.load_postprocessing_substitutions(file_path)
+        return file_path
+
+    def test_memo_is_keyed_on_the_postprocessing_file(self):
+        postprocessing_file = self.write_postprocessing_file(
+            [[['__x__', 'house'], ['x', 'house']]])
+        parser = FakeBatchAddressParser(
+            self.memo_file, postprocessing_file=postprocessing_file)
+        parser.parse(['a'])
+        parser.close()
+
+        parser = FakeBatchAddressParser(
+            self.memo_file, postprocessing_file=postprocessing_file)
+        parser.parse(['a'])
+        parser.close()
+        self.assertEqual(parser.batches, [])
+
+        postprocessing_file = self.write_postprocessing_file(
+            [[['__x__', 'house'], ['y', 'house']]])
+        parser = FakeBatchAddressParser(
+            self.memo_file, postprocessing_file=postprocessing_file)
+        parser.parse(['a'])
+        parser.close()
+        self.assertEqual(parser.batches, [['a']])
@@ -1,7 +1,12 @@
 import unittest
+import os
+import shutil
+import tempfile
 from datetime import datetime as dt
+from unittest import mock
 import pandas as pd
 from real_estate.data_processing.data_storer import DataStorer
+from real_estate.models.unduplicator import Unduplicator
 
 
 class TestDataStorer(unittest.TestCase):
@@ -127,3 +132,87 @@ class TestDataStorer(unittest.TestCase):
             updated_data, self.NEW_DATA.copy(), self.SCRAPE_TIME)
 
         self.assertTrue(repeatedly_updated_data.equals(self.UPDATED_DATA))
+
+    def test_parquet_file_type(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            hdf_file = os.path.join(temp_dir, 'data.h5')
+            parquet_file = os.path.join(temp_dir, 'data.parquet')
+            DataStorer.to_ft(self.UPDATED_DATA, 'hdf', hdf_file)
+            DataStorer.migrate('hdf', hdf_file, 'parquet', parquet_file)
+
+            migrated = DataStorer.read_ft('parquet', parquet_file)
+            self.assertTrue(migrated.equals(DataStorer.apply_schema(
+                DataStorer.maybe_apply_data_fixes(self.UPDATED_DATA.copy()))))
+
+            projected = DataStorer.read_ft(
+                'parquet', parquet_file, ['str', 'last_encounted'])
+            self.assertTrue(projected.equals(
+                self.UPDATED_DATA[['str', 'last_encounted']]))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_projection_with_property_key(self):
+        data = pd.read_hdf(self.TEST_UPDATED_DATA_FILE)
+        columns = ['suburb'] + Unduplicator.NON_PROPERTY_COLUMNS + [
+            Unduplicator.PROPERTY_KEY]
+        expected = Unduplicator.check_and_unduplicate(
+            DataStorer.apply_schema(data.copy()))
+        expected = expected[columns[:-1]]
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            hdf_file = os.path.join(temp_dir, 'data.h5')
+            parquet_file = os.path.join(temp_dir, 'data.parquet')
+            DataStorer.to_ft(data, 'hdf', hdf_file)
+            DataStorer.to_ft(data, 'parquet', parquet_file)
+            for file_type, file_path in (
+                ('hdf', hdf_file), ('parquet', parquet_file)
+            ):
+                projected = DataStorer.read_ft(file_type, file_path, columns)
+                pd.testing.assert_frame_equal(
+                    Unduplicator.check_and_unduplicate(projected), expected)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_migrate_checks_contents(self):
+        to_parquet = DataStorer.to_parquet
+        def changed_to_parquet(df, file_path):
+            df = df.copy()
+            df.loc[df.index[-1], 'str'] = 'changed'
+            to_parquet(df, file_path)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            hdf_file = os.path.join(temp_dir, 'data.h5')
+            parquet_file = os.path.join(temp_dir, 'data.parquet')
+            DataStorer.to_ft(self.UPDATED_DATA, 'hdf', hdf_file)
+            with mock.patch.object(
+                DataStorer, 'to_parquet', changed_to_parquet
+            ):
+                with self.assertRaises(RuntimeError):
+                    DataStorer.migrate(
+                        'hdf', hdf_file, 'parquet', parquet_file)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_schema(self):
+        df = pd.DataFrame({
+            'suburb': ['a', None, 'a'],
+            'bedrooms': [1.0, float('nan'), 3.0],
+            'str': ['x', 'y', 'z'],
+        })
+        schema_df = DataStorer.apply_schema(df)
+        self.assertIs(schema_df, df)
+        self.assertEqual(schema_df['suburb'].dtype, 'category')
+        self.assertEqual(schema_df['bedrooms'].dtype, 'float32')
+        self.assertEqual(schema_df['str'].dtype, object)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            hdf_file = os.path.join(temp_dir, 'data.h5')
+            DataStorer.to_ft(schema_df, 'hdf', hdf_file)
+            self.assertTrue(
+                DataStorer.read_ft('hdf', hdf_file).equals(schema_df))
+        finally:
+            shutil.rmtree(temp_dir)
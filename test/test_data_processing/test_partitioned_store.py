@@ -0,0 +1,117 @@
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime as dt
+import pandas as pd
+from real_estate.data_processing.data_storer import DataStorer
+from real_estate.data_processing.partitioned_store import PartitionedStore
+
+
+class TestPartitionedStore(unittest.TestCase):
+    TEST_DATA_DIR = 'real_estate/test/test_data/'
+    TEST_CURRENT_DATA_FILE = TEST_DATA_DIR + 'current_data_sales.h5'
+    TEST_NEW_DATA_FILE = TEST_DATA_DIR + 'new_data_sales.h5'
+
+    COLUMN_NAMES = [
+        'str', 'state', 'first_encounted', 'last_encounted', 'sequence_broken'
+    ]
+    DATA = pd.DataFrame(
+        columns=COLUMN_NAMES,
+        data=[
+            ['a', 'vic', dt(2016, 5, 1), dt(2016, 5, 2), True],
+            ['b', 'vic', dt(2016, 6, 1), dt(2016, 6, 2), False],
+            ['c', 'nsw', dt(2016, 6, 1), dt(2016, 6, 1), True],
+            ['d', None, dt(2016, 6, 3), dt(2016, 6, 4), False],
+        ]
+    )
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store_dir = os.path.join(self.temp_dir, 'store')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_sorted(self, columns):
+        df = PartitionedStore.read(self.store_dir)
+        return df.sort_values(columns).reset_index(drop=True)
+
+    def test_read_prunes_partitions(self):
+        PartitionedStore.write(self.DATA, self.store_dir)
+
+        manifest = PartitionedStore.load_manifest(self.store_dir)
+        self.assertEqual(manifest, {
+            'nsw/2016-06': {'rows': 1, 'open': False},
+            'unknown/2016-06': {'rows': 1, 'open': True},
+            'vic/2016-05': {'rows': 1, 'open': False},
+            'vic/2016-06': {'rows': 1, 'open': True},
+        })
+
+        pd.testing.assert_frame_equal(self.read_sorted(['str']), self.DATA)
+        self.assertEqual(
+            list(PartitionedStore.read(self.store_dir, states=['vic'])['str']),
+            ['a', 'b']
+        )
+        self.assertEqual(
+            list(PartitionedStore.read(
+                self.store_dir, months=['2016-06'], open_only=True)['str']),
+            ['d', 'b']
+        )
+
+    def test_unknown_months(self):
+        data = self.DATA.copy()
+        data.loc[3, 'first_encounted'] = pd.NaT
+        PartitionedStore.write(data, self.store_dir)
+
+        self.assertIn(
+            'unknown/unknown', PartitionedStore.load_manifest(self.store_dir))
+        pd.testing.assert_frame_equal(self.read_sorted(['str']), data)
+
+    def test_write_removes_old_partitions(self):
+        PartitionedStore.write(self.DATA, self.store_dir)
+        PartitionedStore.write(self.DATA[:1], self.store_dir)
+
+        self.assertEqual(
+            list(PartitionedStore.load_manifest(self.store_dir)),
+            ['vic/2016-05']
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.store_dir)),
+            ['manifest.json', 'vic']
+        )
+        self.assertEqual(
+            os.listdir(os.path.join(self.store_dir, 'vic')),
+            ['2016-05.h5']
+        )
+
+    def test_update_only_rewrites_open_partitions(self):
+        PartitionedStore.write(self.DATA, self.store_dir)
+        closed_file = PartitionedStore.partition_path(
+            self.store_dir, 'vic/2016-05')
+        modified = os.path.getmtime(closed_file)
+
+        read = []
+        def update_function(current_data):
+            read.append(current_data)
+            return current_data
+
+        PartitionedStore.update(self.store_dir, update_function)
+        self.assertEqual(sorted(read[0]['str']), ['b', 'd'])
+        self.assertEqual(os.path.getmtime(closed_file), modified)
+
+    def test_update_data_store_matches_single_file(self):
+        current_data = pd.read_hdf(self.TEST_CURRENT_DATA_FILE)
+        new_data = pd.read_hdf(self.TEST_NEW_DATA_FILE)
+        scrape_time = new_data['date_scraped'].max()
+
+        DataStorer.to_ft(current_data, 'partitioned_hdf', self.store_dir)
+        DataStorer.update_data_store(
+            new_data.copy(), 'partitioned_hdf', self.store_dir, scrape_time)
+        expected = DataStorer.update_data(
+            current_data.copy(), new_data.copy(), scrape_time)
+
+        columns = list(expected.columns)
+        expected = expected.sort_values(columns).reset_index(drop=True)
+        pd.testing.assert_frame_equal(
+            self.read_sorted(columns)[columns], expected)
@@ -1,4 +1,6 @@
 import unittest
+import datetime
+import numpy as np
 import pandas as pd
 from real_estate.data_processing.data_storer import DataStorer
 
@@ -9,24 +11,81 @@ class TestUpdateDataUsingRealData(unittest.TestCase):
     TEST_NEW_DATA_FILE = TEST_DATA_DIR + 'new_data_sales.h5'
     TEST_UPDATED_DATA_FILE = TEST_DATA_DIR + 'updated_data_sales.h5'
 
-    def update_data_using_real_data(self):
-        # This test is slow, and so is excluded from the standard test suite.
-        current_data = pd.read_hdf(self.TEST_CURRENT_DATA_FILE)
-        new_data = pd.read_hdf(self.TEST_NEW_DATA_FILE)
-        expected_updated_data = pd.read_hdf(self.TEST_UPDATED_DATA_FILE)
+    def setUp(self):
+        self.current_data = pd.read_hdf(self.TEST_CURRENT_DATA_FILE)
+        self.new_data = pd.read_hdf(self.TEST_NEW_DATA_FILE)
+        self.scrape_time = self.new_data['date_scraped'].max()
 
+    def test_update_data_using_real_data(self):
+        expected_updated_data = pd.read_hdf(self.TEST_UPDATED_DATA_FILE)
         resultant_updated_data = DataStorer.update_data(
-            current_data.copy(), new_data.copy())
+            self.current_data.copy(), self.new_data.copy(), self.scrape_time)
 
-        self.assertEqual(
-            expected_updated_data.shape, resultant_updated_data.shape)
-        self.assertTrue(
-            expected_updated_data.equals(resultant_updated_data))
+        # The expected data was made when sequences without a match were
+        # broken straight away, so sequence_broken is not compared.
+        columns = expected_updated_data.columns.drop('sequence_broken')
+        pd.testing.assert_frame_equal(
+            resultant_updated_data[columns], expected_updated_data[columns])
 
         repeatedly_updated_data = DataStorer.update_data(
-            resultant_updated_data.copy(), new_data.copy())
+            resultant_updated_data.copy(), self.new_data.copy(),
+            self.scrape_time
+        )
+        pd.testing.assert_frame_equal(
+            repeatedly_updated_data, resultant_updated_data)
+
+    def test_matches_row_by_row_update(self):
+        # The row by row algorithm is slow, so only a sample is used.
+        current_data = self.current_data.iloc[::8].reset_index(drop=True)
+        new_data = self.new_data.iloc[::4].reset_index(drop=True)
+
+        for scrape_time in (
+            self.scrape_time,
+            self.scrape_time + datetime.timedelta(days=40)
+        ):
+            pd.testing.assert_frame_equal(
+                DataStorer.update_data(
+                    current_data.copy(), new_data.copy(), scrape_time),
+                self.row_by_row_update(
+                    current_data.copy(), new_data.copy(), scrape_time)
+            )
+
+    def row_by_row_update(self, current_data, new_data, scrape_time):
+        """DataStorer.update_data as it was before matching_rows."""
+        current_data = DataStorer.break_sequences(current_data, scrape_time)
+        id_columns = DataStorer.get_id_columns(new_data)
+
+        unbrokens = current_data[
+            DataStorer.sequence_unbroken_filter(current_data)]
+        for i, r in unbrokens.iterrows():
+            identicles = new_data.loc[
+                self.identicles_selection(r, new_data, id_columns),
+                'date_scraped'
+            ]
+            if len(identicles) > 0:
+                current_data.loc[i, 'last_encounted'] = identicles.values[0]
+
+        unbrokens = current_data[
+            DataStorer.sequence_unbroken_filter(current_data)]
+        new_uniques_filter = [
+            not self.identicles_selection(r, unbrokens, id_columns).any()
+            for _, r in new_data.iterrows()
+        ]
+        new_uniques = new_data[new_uniques_filter].copy()
+        if new_uniques.empty:
+            return current_data
+        return pd.concat(
+            [current_data, DataStorer.reformat_dataframe(new_uniques)],
+            ignore_index=True
+        )
+
+    def identicles_selection(self, r, x, cols):
+        return np.all([self.eq_test(x[i], r[i]) for i in cols], axis=0)
 
-        self.assertEqual(
-            expected_updated_data.shape, repeatedly_updated_data.shape)
-        self.assertTrue(
-            expected_updated_data.equals(repeatedly_updated_data))
+    def eq_test(self, series, value):
+        if isinstance(value, (datetime.datetime, str)):
+            return series == value
+        elif value is None or np.isnan(value):
+            return series.isnull()
+        else:
+            return series == value
@@ -0,0 +1,55 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from real_estate.geocode_cache import GeocodeCache
+
+
+class TestGeocodeCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, 'geocodes.sqlite')
+        self.cache = GeocodeCache(self.file_path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_key(self):
+        self.assertEqual(
+            GeocodeCache.key((None, '3/ 127', 'a street', 'b', 'vic', 3021)),
+            GeocodeCache.key((np.NaN, '3/ 127', 'a street', 'b', 'vic', 3021.0))
+        )
+        self.assertNotEqual(
+            GeocodeCache.key((None, '1', 'a street', 'b', 'vic', 3021)),
+            GeocodeCache.key((None, '2', 'a street', 'b', 'vic', 3021))
+        )
+
+    def test_lookup_and_update(self):
+        a, b, c = ['["%s"]' % x for x in 'abc']
+        self.cache.update_many([
+            (a, [-33.5, 121.5, True]),
+            (b, [np.NaN, np.NaN, False]),
+        ])
+        self.cache.close()
+
+        self.cache = GeocodeCache(self.file_path)
+        found = self.cache.lookup_many([a, b, c])
+        self.assertEqual(found[a], [-33.5, 121.5, True])
+        self.assertTrue(np.isnan(found[b][0]))
+        self.assertFalse(found[b][2])
+        self.assertNotIn(c, found)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_failures_expire_first(self):
+        a, b = '["a"]', '["b"]'
+        self.cache.update_many([
+            (a, [-33.5, 121.5, True]),
+            (b, [np.NaN, np.NaN, False]),
+        ])
+        self.cache.failure_max_age = -1
+        self.assertEqual(list(self.cache.lookup_many([a, b])), [a])
+
+        self.cache.clear()
+        self.assertEqual(self.cache.lookup_many([a, b]), {})
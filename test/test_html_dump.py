@@ -0,0 +1,51 @@
+import unittest
+import os
+import shutil
+import tempfile
+from real_estate.html_dump import HTMLDump
+
+
+class TestHTMLDump(unittest.TestCase):
+    PAGES = [
+        HTMLDump.make_page('<html>%i</html>' % i, 'url-%i' % i, i, 2600, 'act')
+        for i in range(1, 4)
+    ]
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, 'html.jsonl.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_and_read(self):
+        with HTMLDump(self.file_path) as dump:
+            dump.write_description('test')
+            dump.write_pages(self.PAGES[:2])
+        with HTMLDump(self.file_path) as dump:
+            dump.write_page(self.PAGES[2])
+
+        self.assertEqual(list(HTMLDump.read_pages(self.file_path)), self.PAGES)
+        self.assertEqual(
+            list(HTMLDump.read_htmls(self.file_path)),
+            [page['html'] for page in self.PAGES]
+        )
+
+    def test_read_a_dump_whose_writer_died(self):
+        dump = HTMLDump(self.file_path, flush_every=2).__enter__()
+        dump.write_pages(self.PAGES)
+        # Simulate a crash by never closing the gzip stream.
+        dump.file.fileobj.close()
+
+        self.assertEqual(
+            list(HTMLDump.read_pages(self.file_path)), self.PAGES[:2])
+
+    def test_when_flushed(self):
+        flushed = []
+        with HTMLDump(self.file_path, flush_every=2) as dump:
+            for page in self.PAGES:
+                dump.write_page(page)
+                dump.when_flushed(
+                    lambda page=page: flushed.append(page['page_number']))
+            self.assertEqual(flushed, [1, 2])
+        self.assertEqual(flushed, [1, 2, 3])
@@ -0,0 +1,53 @@
+import unittest
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from real_estate.http_session import PooledSession
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPooledSession(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.server = ThreadingHTTPServer(('localhost', 0), KeepAliveHandler)
+        self.server.daemon_threads = True
+        self.url = 'http://localhost:%i' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @classmethod
+    def tearDownClass(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        session = PooledSession(1, 1, 1)
+        for i in range(5):
+            response = session.get('%s/page-%i' % (self.url, i))
+            self.assertEqual(response.text, '/page-%i' % i)
+
+        self.assertEqual(session.connection_counts(), (1, 4))
+        session.close()
+
+    def test_evicted_connections_are_counted(self):
+        session = PooledSession(1, 1, 1)
+        port = self.server.server_port
+        for i in range(4):
+            host = 'localhost' if i % 2 == 0 else '127.0.0.1'
+            session.get('http://%s:%i/page-%i' % (host, port, i))
+
+        self.assertEqual(session.connection_counts(), (4, 0))
+        session.close()
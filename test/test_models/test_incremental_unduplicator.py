@@ -0,0 +1,83 @@
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from real_estate.models.unduplicator import (
+    Unduplicator, IncrementalUnduplicator)
+from real_estate.test.test_models import test_unduplicator
+
+
+class TestIncrementalUnduplicator(unittest.TestCase):
+    DF = pd.concat(
+        [
+            test_unduplicator.TestUnduplicator.DF_WITH_PRICE_CHANGES,
+            test_unduplicator.TestUnduplicator.DF_WITH_PARALLELS,
+        ],
+        ignore_index=True
+    )
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, 'unduplicator.pkl')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def updated_df(self):
+        df = self.DF.copy()
+        df.loc[7, 'last_encounted'] = datetime(2017, 9, 15)
+        df = df.drop(9)
+        new_rows = pd.DataFrame(
+            data=[
+                ['b', 1, 'private treaty', 2, 2,
+                 datetime(2017, 9, 20), datetime(2017, 9, 20), False],
+                ['f', 1, 'x', 2, 3,
+                 datetime(2017, 9, 20), datetime(2017, 9, 20), False],
+            ],
+            columns=test_unduplicator.TestUnduplicator.TEST_COLUMNS,
+            index=[100, 101]
+        )
+        return pd.concat([df, new_rows])
+
+    def test_unduplicate(self):
+        unduplicator = IncrementalUnduplicator()
+        assert_frame_equal(
+            unduplicator.unduplicate(self.DF.copy()),
+            Unduplicator.check_and_unduplicate(self.DF.copy())
+        )
+        self.assertEqual(unduplicator.touched, 9)
+
+        updated_df = self.updated_df()
+        assert_frame_equal(
+            unduplicator.unduplicate(updated_df.copy()),
+            Unduplicator.check_and_unduplicate(updated_df.copy())
+        )
+        # The changed 'c', the removed 'a', the new 'b' and the new 'f'.
+        self.assertEqual(unduplicator.touched, 4)
+
+    def test_state_file(self):
+        IncrementalUnduplicator(self.state_file).unduplicate(self.DF.copy())
+
+        unduplicator = IncrementalUnduplicator(self.state_file)
+        updated_df = self.updated_df()
+        assert_frame_equal(
+            unduplicator.unduplicate(updated_df.copy()),
+            Unduplicator.check_and_unduplicate(updated_df.copy())
+        )
+        self.assertEqual(unduplicator.touched, 4)
+
+    def test_changed_index(self):
+        unduplicator = IncrementalUnduplicator()
+        unduplicator.unduplicate(self.DF.copy())
+
+        # A partitioned store is read with a new index each time.
+        updated_df = self.updated_df().sample(frac=1, random_state=0)
+        updated_df = updated_df.reset_index(drop=True)
+        assert_frame_equal(
+            unduplicator.unduplicate(updated_df.copy()),
+            Unduplicator.check_and_unduplicate(updated_df.copy())
+        )
+        self.assertEqual(unduplicator.touched, 4)
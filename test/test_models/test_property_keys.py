@@ -0,0 +1,26 @@
+import unittest
+import numpy as np
+import pandas as pd
+from real_estate.models.unduplicator import Unduplicator
+
+
+class TestPropertyKeys(unittest.TestCase):
+    DF = pd.DataFrame({
+        'road': ['a', 'a', None, None, 'b'],
+        'bedrooms': [1.0, 1.0, np.nan, np.nan, 1.0],
+        'price_min': [1, 2, 3, 4, 5],
+    })
+
+    def test_property_keys(self):
+        keys = Unduplicator.property_keys(self.DF)
+        self.assertEqual(keys.dtype, np.uint64)
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(keys[2], keys[3])
+        self.assertEqual(len(set(keys[[0, 2, 4]])), 3)
+
+    def test_has_collisions(self):
+        columns = ['bedrooms', 'road']
+        self.assertFalse(Unduplicator.has_collisions(
+            self.DF, columns, np.array([1, 1, 2, 2, 3], dtype=np.uint64)))
+        self.assertTrue(Unduplicator.has_collisions(
+            self.DF, columns, np.array([1, 1, 2, 2, 1], dtype=np.uint64)))
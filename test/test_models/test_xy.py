@@ -79,6 +79,25 @@ class TestXY(unittest.TestCase):
         f = XY.minimum_suburb_population_filter(self.TEST_SUBURB_FILTER_DF, 3)
         np.testing.assert_array_equal(f, self.EXPECTED_SUBURB_FILTER)
 
+    def test_data_columns(self):
+        self.assertEqual(
+            XY.data_columns(SalesXY, self.COMPLETE_X_SPEC),
+            [
+                'sale_type', 'price_min', 'price_max', 'suburb', 'bedrooms',
+                'bathrooms', 'garage_spaces', 'geocoding_is_valid',
+                'property_type', 'sequence_broken', 'first_encounted',
+                'last_encounted', 'property_key'
+            ]
+        )
+        self.assertEqual(
+            XY.data_columns(SalesXY, self.COMPLETE_X_SPEC, perform_merges=False),
+            [
+                'sale_type', 'price_min', 'price_max', 'suburb', 'bedrooms',
+                'bathrooms', 'garage_spaces', 'geocoding_is_valid',
+                'property_type'
+            ]
+        )
+
     def test_sales_xy(self):
         sales_xy = SalesXY(self.TEST_SALES_DF, self.COMPLETE_X_SPEC, perform_merges=False)
         np.testing.assert_array_equal(sales_xy.y, self.SALES_Y_VALUES)
@@ -0,0 +1,81 @@
+import unittest
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from real_estate.multiprocessing.processed_address_parser import (
+    ParserWorkerPool)
+
+
+class FakeParser(object):
+    def parse_and_validate_addresses(self, strings):
+        return [(s, os.getpid()) for s in strings]
+
+
+class CrashingParser(object):
+    """Crashes the worker on 'crash' until the marker file exists."""
+
+    def __init__(self, marker):
+        self.marker = marker
+
+    def parse_and_validate_addresses(self, strings):
+        if 'crash' in strings and not os.path.exists(self.marker):
+            open(self.marker, 'w').close()
+            os._exit(1)
+        return [(s, os.getpid()) for s in strings]
+
+
+class AlwaysCrashingParser(object):
+    def parse_and_validate_addresses(self, strings):
+        os._exit(1)
+
+
+def crashing_parser():
+    return CrashingParser(TestParserWorkerPool.MARKER)
+
+
+class TestParserWorkerPool(unittest.TestCase):
+    MARKER = None
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        TestParserWorkerPool.MARKER = os.path.join(self.temp_dir, 'crashed')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_parse_in_order(self):
+        strings = ['address %i' % i for i in range(53)]
+        with ParserWorkerPool(3, 5, FakeParser) as pool:
+            first = pool.parse(strings)
+            pids = set(p.process.pid for p in pool.workers)
+            second = pool.parse(iter(strings[:7]))
+
+            # The same workers are reused between calls.
+            self.assertEqual(set(p.process.pid for p in pool.workers), pids)
+
+        self.assertEqual([s for s, _ in first], strings)
+        self.assertEqual([s for s, _ in second], strings[:7])
+        self.assertTrue(set(pid for _, pid in first) <= pids)
+        self.assertEqual(pool.parse([]), [])
+        pool.close()
+
+    def test_restart_crashed_worker(self):
+        strings = ['a', 'b', 'crash', 'c', 'd']
+        with ParserWorkerPool(2, 1, crashing_parser) as pool:
+            results = pool.parse(strings)
+            self.assertEqual(len(pool.workers), 2)
+        self.assertEqual([s for s, _ in results], strings)
+
+    def test_repeated_crashes(self):
+        with ParserWorkerPool(1, 2, AlwaysCrashingParser) as pool:
+            self.assertRaises(RuntimeError, pool.parse, ['a', 'b'])
+            self.assertEqual(pool.workers, [])
+
+    def test_processes(self):
+        # libpostal is large, so only one worker is started by default.
+        self.assertEqual(ParserWorkerPool().processes, 1)
+        settings = SimpleNamespace(address_parser_processes=None)
+        self.assertEqual(ParserWorkerPool.from_settings(settings).processes, 1)
+        settings.address_parser_processes = 4
+        self.assertEqual(ParserWorkerPool.from_settings(settings).processes, 4)
@@ -0,0 +1,19 @@
+import unittest
+from real_estate.multiprocessing.processed_property_scraper import PPS
+
+
+class FakeScraper(object):
+    def scrape_pages(self, pages):
+        return [(page, i) for page in pages for i in range(2)]
+
+
+class TestPPS(unittest.TestCase):
+    def test_scrape_pages(self):
+        pages = ['page %i' % i for i in range(25)]
+        properties = PPS.scrape_pages(
+            FakeScraper(), iter(pages), processes=2, pages_per_shard=4)
+        self.assertEqual(properties, FakeScraper().scrape_pages(pages))
+
+    def test_shard(self):
+        shards = list(PPS.shard(range(10), 4))
+        self.assertEqual(shards, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
@@ -0,0 +1,42 @@
+import unittest
+import time
+import random
+import threading
+from real_estate.ordered_map import OrderedMap
+
+
+class TestOrderedMap(unittest.TestCase):
+    def test_map(self):
+        def slow_square(x):
+            time.sleep(random.random() / 100)
+            return x * x
+
+        results = list(OrderedMap.map(slow_square, range(50), 4))
+        self.assertEqual(results, [x * x for x in range(50)])
+
+    def test_items_are_taken_lazily(self):
+        taken = []
+        def items():
+            for i in range(100):
+                taken.append(i)
+                yield i
+
+        results = OrderedMap.map(lambda x: x, items(), 2)
+        self.assertEqual(next(results), 0)
+        self.assertLessEqual(len(taken), 4)
+        self.assertEqual(list(results), list(range(1, 100)))
+
+    def test_threads(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+        def fn(x):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return x
+
+        list(OrderedMap.map(fn, range(20), 3))
+        self.assertLessEqual(in_flight[1], 3)
@@ -0,0 +1,53 @@
+import unittest
+import os
+import shutil
+import tempfile
+from real_estate.page_cache import PageCache
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, text, headers={}):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+
+class TestPageCache(unittest.TestCase):
+    URL = 'http://example.com/list-1'
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = PageCache(os.path.join(self.temp_dir, 'cache.sqlite'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_conditional_get(self):
+        self.assertEqual(self.cache.conditional_headers(self.URL), {})
+
+        html = self.cache.update(
+            self.URL, FakeResponse(200, '<html>1</html>', {'ETag': '"a"'}))
+        self.assertEqual(html, '<html>1</html>')
+        self.assertFalse(self.cache.is_unchanged(self.URL))
+        self.assertEqual(
+            self.cache.conditional_headers(self.URL), {'If-None-Match': '"a"'})
+
+        html = self.cache.update(self.URL, FakeResponse(304, ''))
+        self.assertEqual(html, '<html>1</html>')
+        self.assertTrue(self.cache.is_unchanged(self.URL))
+
+    def test_content_hash(self):
+        self.cache.update(self.URL, FakeResponse(200, '<html>1</html>'))
+        self.cache.update(self.URL, FakeResponse(200, '<html>1</html>'))
+        self.assertTrue(self.cache.is_unchanged(self.URL))
+
+        self.cache.update(self.URL, FakeResponse(200, '<html>2</html>'))
+        self.assertFalse(self.cache.is_unchanged(self.URL))
+
+    def test_stale_entries_count_as_changed(self):
+        self.cache.max_age = -1
+        self.cache.update(self.URL, FakeResponse(200, '<html>1</html>'))
+        self.assertEqual(self.cache.conditional_headers(self.URL), {})
+        self.cache.update(self.URL, FakeResponse(200, '<html>1</html>'))
+        self.assertFalse(self.cache.is_unchanged(self.URL))
@@ -0,0 +1,57 @@
+import unittest
+import threading
+import time
+from real_estate.page_fetcher import ConcurrentPageFetcher
+
+
+class FakeSite(object):
+    def __init__(self, last_page):
+        self.last_page = last_page
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requested = []
+
+    def retrieve_page(self, url):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.requested.append(url)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+
+        page_num = int(url.split('-')[-1])
+        return 'empty' if page_num > self.last_page else url
+
+    def no_results(html, page_num):
+        return html == 'empty'
+
+
+class TestConcurrentPageFetcher(unittest.TestCase):
+    URLS = ['http://example.com/list-%i' % (i + 1) for i in range(20)]
+    NUMBERED_URLS = list(enumerate(URLS, 1))
+
+    def test_fetch_until_stops_at_the_first_empty_page(self):
+        site = FakeSite(last_page=5)
+        fetcher = ConcurrentPageFetcher(site.retrieve_page, 4, 4)
+        htmls = [html for _, _, html in fetcher.fetch_until(
+            self.NUMBERED_URLS, FakeSite.no_results)]
+
+        self.assertEqual(htmls, self.URLS[:5])
+        self.assertTrue(len(site.requested) <= 8)
+
+    def test_per_host_cap(self):
+        site = FakeSite(last_page=20)
+        fetcher = ConcurrentPageFetcher(site.retrieve_page, 8, 2)
+        htmls = [html for _, _, html in fetcher.fetch_until(
+            self.NUMBERED_URLS, FakeSite.no_results)]
+
+        self.assertEqual(htmls, self.URLS)
+        self.assertTrue(site.max_in_flight <= 2)
+
+    def test_map_in_order(self):
+        site = FakeSite(last_page=20)
+        fetcher = ConcurrentPageFetcher(site.retrieve_page, 4, 4)
+        results = list(fetcher.map_in_order(fetcher.fetch, self.URLS))
+        self.assertEqual(results, self.URLS)
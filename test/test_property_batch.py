@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime
+import pandas as pd
+from pandas.testing import assert_frame_equal
+import real_estate.real_estate_property as rep
+from real_estate.property_batch import PropertyBatch
+
+
+def make_property(sale_type, details, address, state, postcode):
+    p = rep.Property(sale_type, details, rep.AddressText(address))
+    p.state_and_postcode = rep.StateAndPostcode(state, postcode)
+    return p
+
+
+class TestPropertyBatch(unittest.TestCase):
+    SCRAPE_DATETIME = datetime(2017, 6, 1)
+
+    PROPERTIES = [
+        make_property(
+            rep.PrivateTreaty([500000, 550000], False),
+            rep.Details(rep.House(), 3, 2, 1, None, None),
+            '1 mills place, west beach', 'wa', 6450
+        ),
+        make_property(
+            rep.Auction(True),
+            rep.Details(rep.Unit(), 2, 1, None, None, None),
+            '3/127 william street, st albans', 'vic', 3021
+        ),
+        make_property(
+            rep.Rental([450], None),
+            rep.Details(rep.House(), 4, 2.5, 2, None, None),
+            '45 sorell street, chudleigh', 'tas', 7304
+        ),
+    ]
+
+    def to_df_using_tuples(self, properties):
+        data = [p.to_tuple() + (self.SCRAPE_DATETIME,) for p in properties]
+        column_names = properties[0].column_names() + ('date_scraped',)
+        return pd.DataFrame.from_records(data, columns=column_names)
+
+    def test_to_df(self):
+        for properties in (self.PROPERTIES, self.PROPERTIES[:1]):
+            batch = PropertyBatch.from_properties(properties)
+            self.assertEqual(len(batch), len(properties))
+            assert_frame_equal(
+                batch.to_df(self.SCRAPE_DATETIME),
+                self.to_df_using_tuples(properties)
+            )
+
+    def test_columns_of_none(self):
+        auctions = [self.PROPERTIES[1], self.PROPERTIES[1]]
+        df = PropertyBatch.from_properties(auctions).to_df(
+            self.SCRAPE_DATETIME)
+        for name in ('price_min', 'price_max', 'garage_spaces'):
+            self.assertEqual(df[name].dtype, object)
+        assert_frame_equal(df, self.to_df_using_tuples(auctions))
+
+    def test_append(self):
+        batch = PropertyBatch()
+        for p in self.PROPERTIES:
+            batch.append(*p.to_tuple())
+        assert_frame_equal(
+            batch.to_df(self.SCRAPE_DATETIME),
+            self.to_df_using_tuples(self.PROPERTIES)
+        )
+
+    def test_categoricals(self):
+        df = PropertyBatch.from_properties(self.PROPERTIES).to_df(
+            self.SCRAPE_DATETIME, categoricals=True)
+        self.assertEqual(df['property_type'].dtype.name, 'category')
+        self.assertEqual(
+            list(df['property_type']), ['House', 'Unit', 'House'])
@@ -0,0 +1,50 @@
+import unittest
+import pickle
+import real_estate.real_estate_property as rep
+
+
+class TestRealEstateProperty(unittest.TestCase):
+    def test_interned_instances(self):
+        self.assertIs(rep.House(), rep.House())
+        self.assertIs(rep.SaleTypeParseFailed(), rep.SaleTypeParseFailed())
+        self.assertIsNot(rep.House(), rep.Unit())
+        self.assertIs(pickle.loads(pickle.dumps(rep.House())), rep.House())
+
+    def test_interned_instances_are_immutable(self):
+        house = rep.House()
+        self.assertRaises(AttributeError, setattr, house, 'name', 'Unit')
+        self.assertRaises(AttributeError, delattr, house, 'name')
+
+        # Constructing it again does not re-run __init__ on the instance.
+        rep.House()
+        self.assertEqual(house.name, 'House')
+
+    def test_value_classes_have_no_dict(self):
+        for x in (
+            rep.House(), rep.PrivateTreaty([1, 2], False),
+            rep.Details(rep.Unit(), 1, 1, 1, None, None),
+            rep.AddressText('1 mills place'), rep.StateAndPostcode('wa', 6450)
+        ):
+            self.assertFalse(hasattr(x, '__dict__'), type(x))
+
+    def test_equality(self):
+        self.assertEqual(
+            rep.PrivateTreaty([1, 2], False), rep.PrivateTreaty([1, 2], False))
+        self.assertNotEqual(
+            rep.PrivateTreaty([1, 2], False), rep.PrivateTreaty([1, 3], False))
+        self.assertNotEqual(rep.Auction(None), rep.Tender(None))
+        self.assertEqual(
+            rep.RentalTypeParseFailed('a'), rep.RentalTypeParseFailed('a'))
+        self.assertNotEqual(
+            rep.RentalTypeParseFailed('a'), rep.RentalTypeParseFailed('b'))
+
+        a, b = [
+            rep.Property(
+                rep.Auction(False),
+                rep.Details(rep.House(), 1, 1, 1, None, None),
+                rep.AddressText(x)
+            ) for x in ('a', 'a')
+        ]
+        self.assertEqual(a, b)
+        b.address_text = rep.AddressText('b')
+        self.assertNotEqual(a, b)
@@ -0,0 +1,138 @@
+import unittest
+import os
+import time
+import email.utils
+import requests
+from unittest import mock
+from real_estate.retry_policy import (
+    RetryPolicy, AIMDHostLimiter, TokenBucket)
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, headers={}):
+        self.status_code = status_code
+        self.headers = headers
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                '%i error' % self.status_code, response=self)
+
+
+class FakeSession(object):
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = 0
+
+    def get(self, url):
+        self.requests += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class TestRetryPolicy(unittest.TestCase):
+    URL = 'http://example.com/list-1'
+
+    def test_retries_until_success(self):
+        session = FakeSession([
+            requests.exceptions.ConnectionError(),
+            requests.exceptions.ReadTimeout(),
+            FakeResponse(503),
+            FakeResponse(200),
+        ])
+        policy = RetryPolicy(5, 0.001, 0.01, verbose=False)
+        self.assertEqual(policy.get(session, self.URL).status_code, 200)
+        self.assertEqual(session.requests, 4)
+
+    def test_client_errors_are_not_retried(self):
+        session = FakeSession([FakeResponse(404), FakeResponse(200)])
+        policy = RetryPolicy(5, 0.001, 0.01, verbose=False)
+        self.assertRaises(
+            requests.exceptions.HTTPError, policy.get, session, self.URL)
+        self.assertEqual(session.requests, 1)
+
+    def test_gives_up_after_max_attempts(self):
+        session = FakeSession([FakeResponse(500)] * 3)
+        policy = RetryPolicy(3, 0.001, 0.01, verbose=False)
+        self.assertRaises(
+            requests.exceptions.HTTPError, policy.get, session, self.URL)
+        self.assertEqual(session.requests, 3)
+
+    def test_retry_after_sets_the_minimum_delay(self):
+        policy = RetryPolicy(3, 0.001, 0.01, verbose=False)
+        response = FakeResponse(429, {'Retry-After': '2'})
+        self.assertEqual(policy.delay(0, response), 2)
+        self.assertTrue(policy.delay(10) <= 0.01)
+
+    def test_retry_after_date(self):
+        # A "-0000" date is naive, it must not be read as local time.
+        date = email.utils.formatdate(time.time() + 60)
+        response = FakeResponse(
+            429, {'Retry-After': date.replace('+0000', '-0000')})
+        with mock.patch.dict(os.environ, {'TZ': 'Australia/Sydney'}):
+            time.tzset()
+            retry_after = RetryPolicy.retry_after(response)
+        time.tzset()
+        self.assertTrue(55 < retry_after <= 60)
+
+    def test_from_backoff(self):
+        self.assertEqual(RetryPolicy.from_backoff(0.1, 5).max_attempts, 7)
+
+    def test_from_backoff_retries_any_error(self):
+        session = FakeSession([
+            FakeResponse(404),
+            requests.exceptions.TooManyRedirects(),
+            FakeResponse(200),
+        ])
+        policy = RetryPolicy.from_backoff(0.001, 0.01)
+        self.assertEqual(policy.get(session, self.URL).status_code, 200)
+        self.assertEqual(session.requests, 3)
+
+    def test_host_slot_is_released_while_waiting(self):
+        limiter = AIMDHostLimiter(1, increase_after=2)
+        session = FakeSession([FakeResponse(500), FakeResponse(200)])
+        policy = RetryPolicy(
+            2, 0.001, 0.01, host_limiter=limiter, verbose=False)
+        host = 'example.com'
+
+        in_flight_while_waiting = []
+        def sleep(seconds):
+            in_flight_while_waiting.append(limiter.in_flight[host])
+
+        limiter.acquire(host)
+        with mock.patch('real_estate.retry_policy.time.sleep', sleep):
+            policy.get(session, self.URL)
+        self.assertEqual(in_flight_while_waiting, [0])
+        self.assertEqual(limiter.in_flight[host], 1)
+        self.assertTrue(limiter.holds(host))
+        limiter.release(host)
+
+
+class TestAIMDHostLimiter(unittest.TestCase):
+    def test_additive_increase_multiplicative_decrease(self):
+        limiter = AIMDHostLimiter(8, increase_after=2)
+        self.assertEqual(limiter.limit('a'), 8)
+
+        limiter.on_throttle('a')
+        limiter.on_throttle('a')
+        self.assertEqual(limiter.limit('a'), 2)
+        self.assertEqual(limiter.limit('b'), 8)
+
+        for _ in range(4):
+            limiter.on_success('a')
+        self.assertEqual(limiter.limit('a'), 4)
+
+        for _ in range(4):
+            limiter.on_throttle('a')
+        self.assertEqual(limiter.limit('a'), 1)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        self.assertTrue(time.monotonic() - start >= 0.04)
@@ -0,0 +1,61 @@
+import unittest
+import os
+import shutil
+import tempfile
+from real_estate.html_dump import HTMLDump
+from real_estate.scrape_checkpoint import ScrapeCheckpoint
+
+
+class TestScrapeCheckpoint(unittest.TestCase):
+    PAGES = [
+        HTMLDump.make_page('<html>%i</html>' % i, 'url-%i' % i, i, 2600, 'act')
+        for i in range(1, 4)
+    ]
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dump_path = os.path.join(self.temp_dir, 'html.jsonl.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_pages(self, checkpoint, pages):
+        with HTMLDump(self.dump_path) as dump:
+            for page in pages:
+                dump.write_page(page)
+                dump.when_flushed(
+                    lambda page=page: checkpoint.record_page(page))
+
+    def test_resume(self):
+        checkpoint = ScrapeCheckpoint.open(self.dump_path, resume=False)
+        self.write_pages(checkpoint, self.PAGES[:2])
+        checkpoint.record_complete(2601, 'act')
+
+        resumed = ScrapeCheckpoint.open(self.dump_path, resume=True)
+        self.assertEqual(resumed.stored_pages(2600, 'act'), {1, 2})
+        self.assertTrue(resumed.is_complete(2601, 'act'))
+        self.assertFalse(resumed.is_complete(2600, 'act'))
+
+    def test_a_new_run_starts_afresh(self):
+        checkpoint = ScrapeCheckpoint.open(self.dump_path, resume=False)
+        self.write_pages(checkpoint, self.PAGES)
+
+        restarted = ScrapeCheckpoint.open(self.dump_path, resume=False)
+        self.assertTrue(restarted.is_empty())
+        self.assertFalse(os.path.isfile(self.dump_path))
+
+    def test_resume_after_the_writer_died(self):
+        checkpoint = ScrapeCheckpoint.open(self.dump_path, resume=False)
+        dump = HTMLDump(self.dump_path, flush_every=2).__enter__()
+        for page in self.PAGES:
+            dump.write_page(page)
+            dump.when_flushed(lambda page=page: checkpoint.record_page(page))
+        dump.file.fileobj.close()
+
+        # Only the flushed pages were recorded, and only they survive.
+        resumed = ScrapeCheckpoint.open(self.dump_path, resume=True)
+        self.assertEqual(resumed.stored_pages(2600, 'act'), {1, 2})
+
+        with HTMLDump(self.dump_path) as dump:
+            dump.write_page(self.PAGES[2])
+        self.assertEqual(list(HTMLDump.read_pages(self.dump_path)), self.PAGES)
@@ -6,64 +6,150 @@ import pandas as pd
 from scraper.page_scraper import PageScraper
 from real_estate.json_load_and_dump import JSONLoadAndDump
 from real_estate.data_processing.data_storer import DataStorer
+from real_estate.http_session import PooledSession
+from real_estate.html_dump import HTMLDump
+from real_estate.scrape_checkpoint import ScrapeCheckpoint
+from real_estate.retry_policy import RetryPolicy
+from real_estate.page_fetcher import ConcurrentPageFetcher
+from real_estate.page_cache import PageCache
+from real_estate.property_batch import PropertyBatch
 
 from real_estate.memory_usage import MU
 
 
 class WebsiteScraper():
     REQUEST_RETRIES = 20
+    RETRY_BASE_DELAY = 0.5
+    RETRY_MAX_DELAY = 60
+    RETRY_POLICY = None
+    PAGE_CACHE = None
 
     def to_hdf(properties, file_path, scrape_datetime):
         raise RuntimeError('removed.')
 
     def to_df(properties, scrape_datetime):
+        """`properties` is a list of Property objects or a PropertyBatch."""
         if len(properties) == 0:
             raise RuntimeError('Properties list is empty.')
 
-        data = [p.to_tuple() + (scrape_datetime,) for p in properties]
-        column_names = properties[0].column_names() + ('date_scraped',)
-        df = pd.DataFrame.from_records(data, columns=column_names)
-        return df
+        if not isinstance(properties, PropertyBatch):
+            properties = PropertyBatch.from_properties(properties)
+        return properties.to_df(scrape_datetime)
 
     def update_data_store(df, file_type, file_path, scrape_time):
         DataStorer.create_new_unless_exists(df, file_type, file_path)
         DataStorer.update_data_store(df, file_type, file_path, scrape_time)
 
-    def retrieve_and_json_pages_by_postcodes(url_manager, file_path, pcs):
-        htmls = WebsiteScraper.retrieve_all_pages_for_postcodes(
-            url_manager, pcs
-        )
-
-        WebsiteScraper.dump_htmls(
-            {
-                'htmls': htmls,
-                'search_description': (
+    def retrieve_and_dump_pages_by_postcodes(url_manager, file_path, pcs,
+                                             fetcher=None, resume=False):
+        MU.print_memory_usage('04.01')
+        checkpoint = ScrapeCheckpoint.open(file_path, resume)
+        with HTMLDump(file_path) as dump:
+            if checkpoint.is_empty():
+                dump.write_description(
                     'base URL: %s, max page number: %i\npostcodes: %s'
                     % (url_manager.base_url, url_manager.maximum_page_number,
                        ', '.join([str(pc) for pc in pcs]))
                 )
-            },
-            file_path
-        )
+            failures = WebsiteScraper.dump_pages_for_postcodes(
+                url_manager, pcs, dump, checkpoint, fetcher
+            )
+        WebsiteScraper.report_on_requests()
+        MU.print_memory_usage('04.03')
+
+        if len(failures) > 0:
+            raise RuntimeError(
+                'Failed to retrieve %i postcodes, resume the scrape to retry '
+                'them: %s' % (len(failures), str(failures))
+            )
+
+    def dump_pages_for_postcodes(url_manager, pcs, dump, checkpoint,
+                                 fetcher=None):
+        """
+        Write the pages of each postcode to `dump` as they are retrieved,
+        skipping everything `checkpoint` already holds. A postcode that
+        cannot be retrieved is left incomplete, for a resumed run to retry,
+        and returned in the list of failures.
+        """
+        fetch = None if fetcher is None else fetcher.fetch
+
+        def on_page(page):
+            dump.write_page(page)
+            dump.when_flushed(lambda: checkpoint.record_page(page))
+
+        def retrieve(i_pc_state):
+            i, (pc, state) = i_pc_state
+            if checkpoint.is_complete(pc, state):
+                return None
+
+            print(
+                'Retrieving pages for postcode %i in %s, number %i of %i' %
+                (pc, state, i+1, len(pcs))
+            )
+            try:
+                WebsiteScraper.retrieve_pages_for_postcode(
+                    url_manager, pc, state, fetch,
+                    checkpoint.stored_pages(pc, state), on_page
+                )
+            except requests.exceptions.RequestException as e:
+                print(
+                    'Failed to retrieve postcode %i in %s: %s' %
+                    (pc, state, str(e))
+                )
+                return (pc, state)
+
+            dump.when_flushed(lambda: checkpoint.record_complete(pc, state))
+            return None
+
+        if fetcher is None:
+            results = map(retrieve, enumerate(pcs))
+        else:
+            results = fetcher.map_in_order(retrieve, enumerate(pcs))
+        return [x for x in results if x is not None]
 
-    def retrieve_and_json_all_pages(url_manager, file_path):
+    def retrieve_and_dump_all_pages(url_manager, file_path, fetcher=None,
+                                    resume=False):
         MU.print_memory_usage('04.01')
-        htmls = WebsiteScraper.retrieve_all_pages(url_manager)
-        MU.print_memory_usage('04.02')
-        WebsiteScraper.dump_htmls(
-            {
-                'htmls': htmls,
-                'search_description': (
+        checkpoint = ScrapeCheckpoint.open(file_path, resume)
+        if checkpoint.is_complete(None, None):
+            return
+
+        with HTMLDump(file_path) as dump:
+            if checkpoint.is_empty():
+                dump.write_description(
                     'base URL: %s, max page number: %i'
                     % (url_manager.base_url, url_manager.maximum_page_number)
                 )
-            },
-            file_path
-        )
+            for page in WebsiteScraper.iter_all_pages(
+                url_manager, fetcher,
+                skip_pages=checkpoint.stored_pages(None, None)
+            ):
+                dump.write_page(page)
+                dump.when_flushed(
+                    lambda page=page: checkpoint.record_page(page))
+            dump.when_flushed(
+                lambda: checkpoint.record_complete(None, None))
+        WebsiteScraper.report_on_requests()
         MU.print_memory_usage('04.03')
 
-    def dump_htmls(htmls, file_path):
-        JSONLoadAndDump.dump_to_file(htmls, file_path)
+    def report_on_requests():
+        PooledSession.shared().report()
+        if WebsiteScraper.PAGE_CACHE is not None:
+            WebsiteScraper.PAGE_CACHE.report()
+
+    def load_pages(file_path, skip_unchanged=False):
+        """
+        Generate the HTML of each page in the dump. With `skip_unchanged`,
+        pages the page cache found unchanged since the last scrape are left
+        out, so they are neither parsed nor passed to the data store again.
+
+        The listings on skipped pages are not re-encountered, so their
+        last_encounted falls behind by up to PageCache.MAX_AGE, when the
+        page is refreshed. Their sequences are then broken up to that long
+        before they would otherwise be, and durations read from the store
+        are short by as much. Leave `skip_unchanged` off where that matters.
+        """
+        return HTMLDump.read_htmls(file_path, skip_unchanged)
 
     def load_pages_from_json(file_path):
         htmls = JSONLoadAndDump.load_from_file(file_path)
@@ -74,81 +160,117 @@ class WebsiteScraper():
         WebsiteScraper.log_failures(invalids, log_file_path)
         return valids, invalids
 
-    def retrieve_all_pages_for_postcodes(url_manager, pcs):
-        htmls = []
-        for i, (pc, state) in enumerate(pcs):
-            print(
-                'Retrieving pages for postcode %i in %s, number %i of %i' %
-                (pc, state, i+1, len(pcs))
-            )
-            htmls += WebsiteScraper.retrieve_htmls_for_postcode(
-                    url_manager, pc, state
-            )
-        return htmls
+    def retrieve_pages_for_postcode(url_manager, pc, state, fetch=None,
+                                    skip_pages=(), on_page=None):
+        if fetch is None:
+            fetch = WebsiteScraper.retrieve_html_page
 
-    def retrieve_htmls_for_postcode(url_manager, pc, state):
-        htmls = []
+        pages = []
         for i in range(url_manager.maximum_page_number):
             page_num = i + 1
+            if page_num in skip_pages:
+                continue
+
             url = url_manager.make_url_for_page_and_postcode(page_num, pc, state)
-            html = WebsiteScraper.retrieve_html_page(url)
+            html = fetch(url)
 
-            if PageScraper.no_results_check(
-                PageScraper.html_to_soup(html), page_num
-            ):
-                return htmls
+            if WebsiteScraper.is_past_last_page(html, page_num):
+                return pages
             else:
-                htmls.append(html)
-        return htmls
+                page = WebsiteScraper.make_page(html, url, page_num, pc, state)
+                if on_page is None:
+                    pages.append(page)
+                else:
+                    on_page(page)
+        return pages
 
-    def retrieve_all_pages(url_manager, verbose=False):
-        htmls = []
-        for i in range(url_manager.maximum_page_number):
-            page_num = i + 1
+    def iter_all_pages(url_manager, fetcher=None, verbose=False,
+                       skip_pages=()):
+        numbered_urls = [
+            (i + 1, url_manager.make_url_for_page(i + 1))
+            for i in range(url_manager.maximum_page_number)
+            if i + 1 not in skip_pages
+        ]
+
+        if fetcher is not None:
+            for page_num, url, html in fetcher.fetch_until(
+                numbered_urls, WebsiteScraper.is_past_last_page
+            ):
+                yield WebsiteScraper.make_page(html, url, page_num)
+            return
+
+        for page_num, url in numbered_urls:
             if verbose:
                 print('Retrieving page %i.' % page_num)
-            url = url_manager.make_url_for_page(page_num)
             html = WebsiteScraper.retrieve_html_page(url)
 
-            if PageScraper.no_results_check(
-                PageScraper.html_to_soup(html), page_num
-            ):
-                return htmls
+            if WebsiteScraper.is_past_last_page(html, page_num):
+                return
             else:
-                htmls.append(html)
-        return htmls
+                yield WebsiteScraper.make_page(html, url, page_num)
+
+    def make_page(html, url, page_num, pc=None, state=None):
+        cache = WebsiteScraper.PAGE_CACHE
+        return HTMLDump.make_page(
+            html, url, page_num, pc, state,
+            cache is not None and cache.is_unchanged(url)
+        )
+
+    def is_past_last_page(html, page_num):
+        return PageScraper.no_results_check(
+            PageScraper.html_to_soup(html), page_num
+        )
 
     def retrieve_html_page(url):
+        cache = WebsiteScraper.PAGE_CACHE
+        if cache is None:
+            response = WebsiteScraper.attempt_to_retrieve_page(
+                url, 0, WebsiteScraper.REQUEST_RETRIES
+            )
+            html = response.text
+            return html
+
         response = WebsiteScraper.attempt_to_retrieve_page(
-            url, 0, WebsiteScraper.REQUEST_RETRIES
+            url, 0, WebsiteScraper.REQUEST_RETRIES,
+            cache.conditional_headers(url)
         )
-        html = response.text
-        return html
+        return cache.update(url, response)
 
-    def attempt_to_retrieve_page(url, attempts, max_attempts):
-        error = None
-        for i in range(max_attempts):
-            try:
-                response = requests.get(url, timeout=1)
-                response.raise_for_status()
-                return response
-            except requests.exceptions.Timeout as e:
-                error = e
-                pass
-            except requests.exceptions.ReadTimeout as e:
-                error = e
-                pass
-            except requests.exceptions.ConnectionError as e:
-                error = e
-                pass
-            except requests.exceptions.ConnectTimeout as e:
-                error = e
-                pass
-            except requests.exceptions.HTTPError as e:
-                error = e
-                print(error)
-            print('Trying to get page again, attempt %i.' % i)
-        raise error
+    def attempt_to_retrieve_page(url, attempts, max_attempts, headers=None):
+        policy = WebsiteScraper.retry_policy()
+        if policy.max_attempts != max_attempts - attempts:
+            policy = RetryPolicy(
+                max_attempts - attempts, policy.base_delay, policy.max_delay,
+                policy.rate_limiter, policy.host_limiter
+            )
+        return policy.get(PooledSession.shared(), url, headers=headers)
+
+    def configure_from_settings(settings):
+        """
+        Set up the shared session, retry policy and page cache from
+        `settings`, and return a fetcher that shares the policy's adaptive
+        host limits.
+        """
+        PooledSession.set_shared(PooledSession.from_settings(settings))
+        policy = RetryPolicy.from_settings(
+            settings, WebsiteScraper.REQUEST_RETRIES)
+        WebsiteScraper.set_retry_policy(policy)
+        if settings.page_cache_file is not None:
+            WebsiteScraper.PAGE_CACHE = PageCache(settings.page_cache_file)
+        return ConcurrentPageFetcher.from_settings(
+            WebsiteScraper.retrieve_html_page, settings, policy.host_limiter)
+
+    def retry_policy():
+        if WebsiteScraper.RETRY_POLICY is None:
+            WebsiteScraper.RETRY_POLICY = RetryPolicy(
+                WebsiteScraper.REQUEST_RETRIES,
+                WebsiteScraper.RETRY_BASE_DELAY,
+                WebsiteScraper.RETRY_MAX_DELAY
+            )
+        return WebsiteScraper.RETRY_POLICY
+
+    def set_retry_policy(policy):
+        WebsiteScraper.RETRY_POLICY = policy
 
     def split_scrapings(scrapings):
         checked_scrapings = [(x.is_valid(), x) for x in scrapings]